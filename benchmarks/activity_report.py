@@ -0,0 +1,171 @@
+"""
+Measure how often activity tracking skips cells, and check that skipping is exact on a grid where it does.
+
+On the presets, nearly every cell's temperature, water mass or pollution changes a little every day, so activity
+tracking rarely finds anything to skip; the first part of the report measures that skip rate. The second part
+runs a crafted quiescent grid where the skip path is actually taken: a deep desert at its baseline temperature
+under a layer of air at the same temperature. The water of the upper desert layers keeps rising into the air, so
+active cells border skipped ones on every day. That grid is run with the reference engine and, from the same
+day-0 state, with activity tracking (kept cells bypassing the later phases) and with activity tracking plus
+validation (kept cells also recomputed and compared) and with activity tracking by chunks ("chunk_size"), whose
+bottom chunks fall asleep, and every day of the runs is compared exactly.
+
+Usage:
+    python -m benchmarks.activity_report [--preset NAME] [--days N] [--grid-size X,Y,Z] [--seed S]
+                                         [--quiescent-grid-size X,Y,Z] [--quiescent-days N] [--chunk-size N]
+"""
+import argparse
+
+import numpy as np
+
+from config.Config import config_instance
+from config.presets import PRESET_CONFIGS, DEFAULT_PRESET
+from core.Particle import Particle
+from core.Simulation import Simulation
+from core.World import World
+from .equivalence import compare_runs, describe
+from .precision_report import run_preset
+
+# Water mass of the desert cells of the quiescent grid
+QUIESCENT_WATER_MASS = 0.2
+
+
+def skip_statistics(simulation):
+    """
+    Sum the activity tracking counters of a precomputed run.
+
+    Args:
+        simulation (Simulation): A run with the "activity_tracking" option.
+
+    Returns:
+        dict: Number of cell updates ("cells", over the simulated days), cells kept as is ("skipped"), their
+            share ("skip_rate"), the skipped cells found diverging by "activity_validation" ("mismatches") and,
+            with "chunk_size", the number of asleep chunks summed over the days ("asleep_chunks").
+    """
+    states = simulation.states[1:]
+    cells = int(np.prod(simulation.grid_size)) * len(states)
+    skipped = sum(state.skipped_cells for state in states)
+    return {
+        "cells": cells,
+        "skipped": skipped,
+        "skip_rate": skipped / cells if cells else 0.0,
+        "mismatches": sum(state.activity_mismatches for state in states),
+        "asleep_chunks": sum(int(state.asleep_chunks.sum()) for state in states if state.asleep_chunks is not None),
+    }
+
+
+def quiescent_config(config):
+    """
+    Adapt a configuration so that the quiescent grid stays at rest: air shares the desert's baseline temperature
+    (no temperature decay in either), and forests get a baseline far enough that no desert converts to forest.
+
+    Args:
+        config (dict): The configuration to adapt.
+
+    Returns:
+        dict: The adapted copy.
+    """
+    config = dict(config)
+    baseline_temperature = list(config["baseline_temperature"])
+    baseline_temperature[6] = baseline_temperature[1]
+    baseline_temperature[4] = -50.0
+    config["baseline_temperature"] = baseline_temperature
+    return config
+
+
+def build_quiescent_world(grid_size, config):
+    """
+    Build the quiescent day-0 world: desert cells at their baseline temperature, holding some water and no
+    pollution, under a top layer of air at the same temperature.
+
+    Args:
+        grid_size (tuple): Dimensions of the grid.
+        config (dict): Configuration from quiescent_config.
+
+    Returns:
+        World: The day-0 world.
+    """
+    world = World(
+        grid_size=grid_size,
+        initial_ratios={"forest": 0.0, "city": 0.0, "desert": 1.0, "vacuum": 0.0},
+        day_number=0,
+        config=config
+    )
+    temperature = config["baseline_temperature"][1]
+    for position in np.ndindex(*grid_size):
+        is_air = position[2] == grid_size[2] - 1
+        world.grid[position] = Particle(
+            cell_type=6 if is_air else 1,
+            temperature=temperature,
+            water_mass=0.0 if is_air else QUIESCENT_WATER_MASS,
+            pollution_level=0.0,
+            direction=(0, 0, 0),
+            position=position,
+            grid_size=grid_size,
+            config=config
+        )
+    world._recalculate_global_attributes()
+    return world
+
+
+def check_quiescent(grid_size, days, chunk_size=4, options=None):
+    """
+    Run the quiescent grid with the reference engine, with activity tracking, with activity tracking plus
+    validation and with activity tracking by chunks, from the same day-0 world, and compare the runs exactly.
+
+    Args:
+        grid_size (tuple): Dimensions of the grid.
+        days (int): Number of days to simulate.
+        chunk_size (int, optional): Edge length of the chunks of the "chunked" run.
+        options (dict, optional): Further engine options of the tracked runs.
+
+    Returns:
+        dict: For "tracked", "validated" and "chunked", the skip statistics (see skip_statistics) and the comparison with
+            the reference run ("report", see equivalence.compare_runs).
+    """
+    config = quiescent_config(config_instance.get())
+    reference = Simulation(grid_size=grid_size, initial_ratios=None, days=days, config=config)
+    reference.states.append(build_quiescent_world(grid_size, config))
+    reference._update_aggregates(reference.states[0])
+    candidates = {
+        "tracked": reference.fork(0, dict(options or {}, activity_tracking=True)),
+        "validated": reference.fork(0, dict(options or {}, activity_tracking=True, activity_validation=True)),
+        "chunked": reference.fork(0, dict(options or {}, activity_tracking=True, chunk_size=chunk_size)),
+    }
+    reference.precompute()
+    results = {}
+    for name, candidate in candidates.items():
+        candidate.precompute()
+        results[name] = {**skip_statistics(candidate), "report": compare_runs(reference, candidate, 0.0, 0.0)}
+    return results
+
+
+def main():
+    default_name = next(name for name, preset in PRESET_CONFIGS.items() if preset is DEFAULT_PRESET)
+    parser = argparse.ArgumentParser(description="Skip rate and exactness of activity tracking.")
+    parser.add_argument("--preset", default=default_name, choices=sorted(PRESET_CONFIGS), help="Preset to run.")
+    parser.add_argument("--days", type=int, default=15, help="Number of days of the preset run.")
+    parser.add_argument("--grid-size", default="12,12,10", help="Grid size of the preset run as X,Y,Z.")
+    parser.add_argument("--seed", type=int, default=0, help="Random seed of the preset run.")
+    parser.add_argument("--quiescent-grid-size", default="12,12,12", help="Grid size of the quiescent grid.")
+    parser.add_argument("--quiescent-days", type=int, default=12, help="Number of days of the quiescent runs.")
+    parser.add_argument("--chunk-size", type=int, default=4, help="Chunk size of the chunked quiescent run.")
+    args = parser.parse_args()
+
+    grid_size = tuple(int(value) for value in args.grid_size.split(","))
+    preset_run = run_preset(args.preset, args.days, grid_size, args.seed, {"activity_tracking": True})
+    statistics = skip_statistics(preset_run)
+    print(f"{args.preset}: {args.days} days on a {'x'.join(map(str, grid_size))} grid: "
+          f"{statistics['skipped']} of {statistics['cells']} cell updates skipped ({statistics['skip_rate']:.1%})")
+
+    quiescent_size = tuple(int(value) for value in args.quiescent_grid_size.split(","))
+    print(f"quiescent grid: {args.quiescent_days} days on a {'x'.join(map(str, quiescent_size))} grid")
+    for name, result in check_quiescent(quiescent_size, args.quiescent_days, args.chunk_size).items():
+        chunks = f", {result['asleep_chunks']} asleep chunks" if name == "chunked" else ""
+        print(f"  {name:<12}{result['skipped']} of {result['cells']} cell updates skipped "
+              f"({result['skip_rate']:.1%}){chunks}, {result['mismatches']} validation mismatches; "
+              f"{describe(result['report'])}")
+
+
+if __name__ == "__main__":
+    main()
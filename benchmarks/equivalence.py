@@ -0,0 +1,186 @@
+"""
+Check that a candidate engine (a set of engine options) reproduces the reference engine.
+
+The reference run precomputes a preset from a seeded day-0 world; the candidate is forked from that same day-0
+state with the engine options applied (see Simulation.fork), so both start from identical particles. Every day,
+the per-voxel fields of both runs are compared within tolerances, as are all the `*_over_time` aggregates. The
+first diverging voxel is reported along with the rule that produced it, i.e. the `_update_*` method of the cell
+type found there the day before in the reference run.
+
+Usage:
+    python -m benchmarks.equivalence [--preset NAME] [--engine NAME] [--days N] [--grid-size X,Y,Z]
+                                     [--seed S] [--atol A] [--rtol R]
+"""
+import argparse
+
+import numpy as np
+
+from config.presets import PRESET_CONFIGS, DEFAULT_PRESET, PARTICLE_MAPPING
+from .precision_report import run_preset
+
+# Fields compared exactly; the other fields are compared within the tolerances
+EXACT_FIELDS = ("cell_type", "direction")
+FLOAT_FIELDS = ("temperature", "water_mass", "pollution_level")
+
+
+def find_first_divergence(reference_fields, candidate_fields, atol, rtol):
+    """
+    Find the first voxel (in grid order) where two sets of field arrays differ.
+
+    Args:
+        reference_fields (dict): Field arrays of the reference state (see World.get_field_arrays).
+        candidate_fields (dict): Field arrays of the candidate state.
+        atol (float): Absolute difference tolerated for temperature, water mass and pollution.
+        rtol (float): Difference tolerated relative to the reference values, on top of `atol`.
+
+    Returns:
+        dict: The first diverging "position", the reference and candidate values of every field differing
+            there ("fields") and the number of diverging voxels ("voxels"), or None if the states match.
+    """
+    mismatches = {}
+    for name in EXACT_FIELDS:
+        mismatch = reference_fields[name] != candidate_fields[name]
+        mismatches[name] = mismatch.any(axis=-1) if name == "direction" else mismatch
+    for name in FLOAT_FIELDS:
+        reference = reference_fields[name].astype(np.float64)
+        candidate = candidate_fields[name].astype(np.float64)
+        mismatches[name] = ~np.isclose(candidate, reference, rtol=rtol, atol=atol)
+
+    diverging = np.logical_or.reduce(list(mismatches.values()))
+    if not diverging.any():
+        return None
+
+    position = tuple(int(index) for index in np.argwhere(diverging)[0])
+    fields = {}
+    for name, mismatch in mismatches.items():
+        if mismatch[position]:
+            fields[name] = (reference_fields[name][position].tolist(), candidate_fields[name][position].tolist())
+    return {"position": position, "fields": fields, "voxels": int(diverging.sum())}
+
+
+def compare_runs(reference, candidate, atol=1e-6, rtol=1e-6):
+    """
+    Compare two precomputed simulations of the same grid day by day.
+
+    Args:
+        reference (Simulation): The reference run.
+        candidate (Simulation): The candidate run, started from the same day-0 state.
+        atol (float): Absolute difference tolerated for float fields and aggregates.
+        rtol (float): Relative difference tolerated for float fields and aggregates, on top of `atol`.
+
+    Returns:
+        dict: "equivalent" (bool), "days_compared", the first diverging voxel ("first_divergence", None if
+            all fields match: its day, position, differing fields, number of diverging voxels, and the
+            "rule" that produced it), the series whose first divergent day is the earliest
+            ("first_series_divergence", None if all match) and the full series comparison ("series",
+            see Simulation.compare_series).
+    """
+    days = min(len(reference.states), len(candidate.states))
+    first_divergence = None
+    for day in range(days):
+        divergence = find_first_divergence(
+            reference.states[day].get_field_arrays(), candidate.states[day].get_field_arrays(), atol, rtol)
+        if divergence is not None:
+            if day > 0:
+                previous_type = int(reference.states[day - 1].get_field_arrays(("cell_type",))["cell_type"][divergence["position"]])
+                divergence["rule"] = f"_update_{PARTICLE_MAPPING[previous_type].lower()}"
+            else:
+                divergence["rule"] = None  # Different initial worlds
+            first_divergence = {"day": day, **divergence}
+            break
+
+    series = reference.compare_series(candidate, atol=atol, rtol=rtol)
+    divergent_series = [
+        (comparison["first_divergent_day"], name)
+        for name, comparison in series.items() if comparison["first_divergent_day"] is not None
+    ]
+    first_series_divergence = None
+    if divergent_series:
+        day, name = min(divergent_series)
+        first_series_divergence = {"day": day, "series": name}
+
+    return {
+        "equivalent": first_divergence is None and first_series_divergence is None,
+        "days_compared": days,
+        "first_divergence": first_divergence,
+        "first_series_divergence": first_series_divergence,
+        "series": series,
+    }
+
+
+def check_equivalence(preset_name, options, grid_size, days, seed=0, atol=1e-6, rtol=1e-6, reference=None):
+    """
+    Run a preset with the reference engine and with a candidate engine from the same day-0 state, and compare them.
+
+    Args:
+        preset_name (str): Name of the preset in PRESET_CONFIGS.
+        options (dict): Engine options of the candidate (e.g. {"sparse_vacuum": True}).
+        grid_size (tuple): Dimensions of the grid.
+        days (int): Number of days to simulate.
+        seed (int): Seed for NumPy's random generator used to build the day-0 world.
+        atol (float): Absolute difference tolerated for float fields and aggregates.
+        rtol (float): Relative difference tolerated for float fields and aggregates.
+        reference (Simulation, optional): An already precomputed reference run of the same preset, grid and
+            seed, to reuse instead of running it again.
+
+    Returns:
+        dict: The comparison (see compare_runs).
+    """
+    if reference is None:
+        reference = run_preset(preset_name, days, grid_size, seed)
+    candidate = reference.fork(0, options)
+    candidate.precompute()
+    return compare_runs(reference, candidate, atol, rtol)
+
+
+def describe(report):
+    """
+    Summarize an equivalence report in one line.
+
+    Args:
+        report (dict): Report returned by compare_runs.
+
+    Returns:
+        str: The summary.
+    """
+    if report["equivalent"]:
+        return f"equivalent over {report['days_compared']} days"
+    parts = []
+    divergence = report["first_divergence"]
+    if divergence is not None:
+        fields = ", ".join(
+            f"{name} {reference} -> {candidate}" for name, (reference, candidate) in divergence["fields"].items())
+        parts.append(
+            f"fields diverge on day {divergence['day']} at {divergence['position']} "
+            f"({divergence['voxels']} voxels; rule {divergence['rule']}; {fields})")
+    series = report["first_series_divergence"]
+    if series is not None:
+        parts.append(f"{series['series']} diverges on day {series['day']}")
+    return "; ".join(parts)
+
+
+def main():
+    from .suite import ENGINES  # Engine option sets shared with the benchmark suite
+
+    default_name = next(name for name, preset in PRESET_CONFIGS.items() if preset is DEFAULT_PRESET)
+    parser = argparse.ArgumentParser(description="Compare a candidate engine with the reference engine.")
+    parser.add_argument("--preset", default=default_name, choices=sorted(PRESET_CONFIGS), help="Preset to run.")
+    parser.add_argument("--engine", nargs="+", default=[name for name in ENGINES if name != "reference"],
+                        choices=list(ENGINES), help="Engine option sets to check.")
+    parser.add_argument("--days", type=int, default=10, help="Number of days to compare.")
+    parser.add_argument("--grid-size", default="10,10,10", help="Grid size as X,Y,Z.")
+    parser.add_argument("--seed", type=int, default=0, help="Random seed for the day-0 world.")
+    parser.add_argument("--atol", type=float, default=1e-6, help="Absolute tolerance for float fields and aggregates.")
+    parser.add_argument("--rtol", type=float, default=1e-6, help="Relative tolerance for float fields and aggregates.")
+    args = parser.parse_args()
+
+    grid_size = tuple(int(value) for value in args.grid_size.split(","))
+    reference = run_preset(args.preset, args.days, grid_size, args.seed)
+    for engine_name in args.engine:
+        report = check_equivalence(
+            args.preset, ENGINES[engine_name], grid_size, args.days, args.seed, args.atol, args.rtol, reference)
+        print(f"{engine_name:<16}{describe(report)}")
+
+
+if __name__ == "__main__":
+    main()
@@ -0,0 +1,107 @@
+"""
+Measure the memory footprint and construction rate of Particle objects.
+
+Compares the slotted, flyweight-based Particle with the previous layout, where every particle kept its
+attributes in an instance dictionary along with its own copy of the configuration (or, later, a reference
+to its world's configuration).
+
+Usage:
+    python -m benchmarks.particle_footprint [--count N]
+"""
+import argparse
+import time
+import tracemalloc
+
+from config.Config import config_instance
+from core.Particle import Particle
+
+
+class DictParticle:
+    """
+    Particle storage as it was before __slots__: per-instance attributes, configuration and grid size.
+    """
+    def __init__(self, cell_type, temperature, water_mass, pollution_level, direction, position, grid_size, config=None):
+        self.cell_type = cell_type
+        self.temperature = temperature
+        self.water_mass = water_mass
+        self.pollution_level = pollution_level
+        self.direction = direction
+        self.position = position
+        self.grid_size = grid_size
+        self.config = config if config is not None else config_instance.get()
+
+
+def build_particles(particle_class, count, grid_size, config):
+    """
+    Create `count` particles spread over the grid, the way World.initialize_grid does.
+
+    Args:
+        particle_class (type): Particle class to instantiate.
+        count (int): Number of particles to create.
+        grid_size (tuple): Dimensions of the grid.
+        config (dict or None): Configuration passed to every particle (None lets each particle fetch its own copy).
+
+    Returns:
+        list: The particles.
+    """
+    x, y, z = grid_size
+    return [
+        particle_class(
+            cell_type=index % 9,
+            temperature=float(index % 40),
+            water_mass=0.5,
+            pollution_level=0.0,
+            direction=(0, 0, 0),
+            position=(index % x, (index // x) % y, (index // (x * y)) % z),
+            grid_size=grid_size,
+            config=config
+        )
+        for index in range(count)
+    ]
+
+
+def measure(particle_class, count, grid_size, config):
+    """
+    Measure the bytes allocated per particle and the number of particles created per second.
+
+    Returns:
+        tuple: (bytes per particle, particles per second)
+    """
+    tracemalloc.start()
+    before, _ = tracemalloc.get_traced_memory()
+    particles = build_particles(particle_class, count, grid_size, config)
+    after, _ = tracemalloc.get_traced_memory()
+    tracemalloc.stop()
+    bytes_per_particle = (after - before) / count
+    del particles
+
+    start = time.perf_counter()
+    particles = build_particles(particle_class, count, grid_size, config)
+    elapsed = time.perf_counter() - start
+    del particles
+    return bytes_per_particle, count / elapsed
+
+
+def main():
+    parser = argparse.ArgumentParser(description="Particle memory footprint and construction rate.")
+    parser.add_argument("--count", type=int, default=100_000, help="Number of particles to create per measurement.")
+    args = parser.parse_args()
+
+    config = config_instance.get()
+    grid_size = tuple(config["grid_size"])
+    layouts = [
+        ("dict, own config copy (before)", DictParticle, None),
+        ("dict, shared config", DictParticle, config),
+        ("slots + flyweight (after)", Particle, config),
+    ]
+
+    print(f"{'layout':<34}{'bytes/particle':>16}{'particles/s':>16}")
+    for name, particle_class, particle_config in layouts:
+        # Copying the configuration for every particle is slow, so measure that layout on fewer particles
+        count = args.count if particle_config is not None else max(1, args.count // 10)
+        bytes_per_particle, rate = measure(particle_class, count, grid_size, particle_config)
+        print(f"{name:<34}{bytes_per_particle:>16,.0f}{rate:>16,.0f}")
+
+
+if __name__ == "__main__":
+    main()
@@ -0,0 +1,71 @@
+"""
+Run a preset at float64 and at float32 field precision and report how far every `*_over_time` series diverges.
+
+Usage:
+    python -m benchmarks.precision_report [--preset NAME] [--days N] [--grid-size X,Y,Z] [--seed S]
+"""
+import argparse
+
+import numpy as np
+
+from config.presets import PRESET_CONFIGS, DEFAULT_PRESET
+from core.Simulation import Simulation
+
+
+def run_preset(preset_name, days, grid_size, seed, overrides=None):
+    """
+    Precompute a preset with the given seed and configuration overrides.
+
+    Args:
+        preset_name (str): Name of the preset in PRESET_CONFIGS.
+        days (int): Number of days to simulate.
+        grid_size (tuple): Dimensions of the grid.
+        seed (int): Seed for NumPy's random generator, so that both runs start from the same world.
+        overrides (dict, optional): Configuration values replacing the preset's.
+
+    Returns:
+        Simulation: The precomputed simulation.
+    """
+    config = dict(PRESET_CONFIGS[preset_name])
+    config.update(overrides or {})
+    np.random.seed(seed)
+    simulation = Simulation(grid_size=grid_size, initial_ratios=config["initial_ratios"], days=days, config=config)
+    simulation.precompute()
+    return simulation
+
+
+def compare_precisions(preset_name, days, grid_size, seed=0):
+    """
+    Compare a float32 run of a preset with the float64 run.
+
+    Returns:
+        dict: Divergence of every series (see Simulation.compare_series).
+    """
+    reference = run_preset(preset_name, days, grid_size, seed)
+    reduced = run_preset(preset_name, days, grid_size, seed, {"field_precision": "float32"})
+    return reference.compare_series(reduced)
+
+
+def main():
+    default_name = next(name for name, preset in PRESET_CONFIGS.items() if preset is DEFAULT_PRESET)
+    parser = argparse.ArgumentParser(description="Divergence of float32 fields from float64 fields.")
+    parser.add_argument("--preset", default=default_name, choices=sorted(PRESET_CONFIGS), help="Preset to run.")
+    parser.add_argument("--days", type=int, default=None, help="Number of days (defaults to the preset's).")
+    parser.add_argument("--grid-size", default=None, help="Grid size as X,Y,Z (defaults to the preset's).")
+    parser.add_argument("--seed", type=int, default=0, help="Random seed shared by both runs.")
+    args = parser.parse_args()
+
+    preset = PRESET_CONFIGS[args.preset]
+    days = args.days or preset["days"]
+    grid_size = tuple(int(value) for value in args.grid_size.split(",")) if args.grid_size else tuple(preset["grid_size"])
+
+    report = compare_precisions(args.preset, days, grid_size, args.seed)
+    print(f"{args.preset}: {days} days on a {'x'.join(map(str, grid_size))} grid, float32 vs float64")
+    print(f"{'series':<44}{'max abs diff':>16}{'max rel diff':>16}{'final abs diff':>16}")
+    for name, divergence in report.items():
+        print(f"{name:<44}{divergence['max_abs_diff']:>16.3e}{divergence['max_rel_diff']:>16.3e}"
+              f"{divergence['final_abs_diff']:>16.3e}")
+
+
+if __name__ == "__main__":
+    main()
@@ -0,0 +1,315 @@
+"""
+Time the main stages of the engine across grid sizes, presets and engine option sets, and save the results as JSON
+so that runs of different commits can be compared.
+
+Stages:
+    initialize_grid                World.initialize_grid on a new world.
+    update_cells_on_grid           One day of World.update_cells_on_grid on the initialized world.
+    recalculate_global_attributes  World._recalculate_global_attributes on the updated world.
+    precompute                     Simulation.precompute for the requested number of days.
+    precompute_visualizations      MatplotlibDisplay.precompute_visualizations for the precomputed days.
+
+Each stage is timed on its own run; its peak traced memory (tracemalloc) is measured on a second, identical run,
+since tracing slows allocation-heavy code down too much to time both at once. With --check-equivalence, every
+engine other than the reference is also checked against the reference engine (see benchmarks.equivalence), so
+speedups and correctness are reported together.
+
+Usage:
+    python -m benchmarks.suite [--sizes 10,16,32] [--presets NAME ...] [--engines NAME ...] [--days N]
+                               [--seed S] [--output results.json] [--compare baseline.json]
+                               [--no-memory] [--skip-display] [--check-equivalence] [--atol A] [--rtol R]
+"""
+import argparse
+import json
+import logging
+import platform
+import subprocess
+import time
+import tracemalloc
+
+import numpy as np
+
+from config.presets import PRESET_CONFIGS, DEFAULT_PRESET
+from core.World import World
+from core.Simulation import Simulation
+from .equivalence import check_equivalence, describe
+from .precision_report import run_preset
+
+# Edge lengths of the cubic grids the suite can cover; large grids take minutes per stage with the object engine
+GRID_SIZES = (10, 16, 32, 64, 128)
+DEFAULT_GRID_SIZES = (10, 16, 32)
+
+# Engine option sets (see the README's engine options), applied on top of each preset
+ENGINES = {
+    "reference": {},
+    "vectorized": {"vectorized_precipitation": True, "vectorized_wind": True},
+    "vectorized_wind": {"vectorized_wind": True},  # Also checked alone: it must match the inline precipitation path
+    "neighbor_tables": {"neighbor_histograms": True, "neighbor_slots": True},
+    "activity": {"activity_tracking": True, "chunk_size": 4},
+    "sparse": {"sparse_vacuum": True},
+    "compact": {"field_precision": "float32", "compact_history": True},
+}
+
+STAGES = (
+    "initialize_grid", "update_cells_on_grid", "recalculate_global_attributes",
+    "precompute", "precompute_visualizations",
+)
+
+
+def measure(setup, run, memory=True):
+    """
+    Time a stage, then measure its peak traced memory on a second run.
+
+    Args:
+        setup (callable): Builds the input of the stage; not timed.
+        run (callable): Runs the stage on the value returned by `setup`.
+        memory (bool): Whether to measure the peak memory. Defaults to True.
+
+    Returns:
+        tuple: Result of the timed run, seconds taken, and peak traced bytes (None when not measured).
+    """
+    value = setup()
+    started = time.perf_counter()
+    result = run(value)
+    seconds = time.perf_counter() - started
+
+    peak = None
+    if memory:
+        value = setup()
+        tracemalloc.start()
+        try:
+            run(value)
+            _, peak = tracemalloc.get_traced_memory()
+        finally:
+            tracemalloc.stop()
+    return result, seconds, peak
+
+
+def benchmark_case(preset_name, engine_name, size, days, seed=0, memory=True, display=True):
+    """
+    Run every stage for one preset, engine option set and grid size.
+
+    Args:
+        preset_name (str): Name of the preset in PRESET_CONFIGS.
+        engine_name (str): Name of the option set in ENGINES.
+        size (int): Edge length of the cubic grid.
+        days (int): Number of days precomputed by the precompute stage.
+        seed (int): Seed for NumPy's random generator, so every stage starts from the same world.
+        memory (bool): Whether to measure peak memory.
+        display (bool): Whether to run the precompute_visualizations stage.
+
+    Returns:
+        dict: The case parameters and, for each stage, its "seconds", "voxels_per_second" and "peak_bytes".
+    """
+    config = dict(PRESET_CONFIGS[preset_name])
+    config.update(ENGINES[engine_name])
+    grid_size = (size, size, size)
+    voxels = size ** 3
+
+    def new_world():
+        np.random.seed(seed)
+        return World(grid_size=grid_size, initial_ratios=config["initial_ratios"], day_number=0, config=config)
+
+    def initialize(world):
+        world.initialize_grid()
+        return world
+
+    def new_simulation():
+        np.random.seed(seed)
+        return Simulation(grid_size=grid_size, initial_ratios=config["initial_ratios"], days=days, config=config)
+
+    def precompute(simulation):
+        simulation.precompute()
+        return simulation
+
+    stages = {}
+
+    def record(name, timing, voxel_updates):
+        _, seconds, peak = timing
+        stages[name] = {
+            "seconds": seconds,
+            "voxels_per_second": voxel_updates / seconds if seconds > 0 else None,
+            "peak_bytes": peak,
+        }
+        return timing[0]
+
+    initial_world = record("initialize_grid", measure(new_world, initialize, memory), voxels)
+    updated_world = record("update_cells_on_grid", measure(
+        lambda: initial_world.clone(config=config), lambda world: world.update_cells_on_grid() or world, memory), voxels)
+    record("recalculate_global_attributes", measure(
+        lambda: updated_world, lambda world: world._recalculate_global_attributes(), memory), voxels)
+    simulation = record("precompute", measure(new_simulation, precompute, memory), voxels * days)
+
+    if display:
+        from display.MatplotlibDisplay import MatplotlibDisplay  # Needs Tkinter, so only imported when used
+
+        record("precompute_visualizations", measure(
+            lambda: MatplotlibDisplay(simulation, config=config), lambda view: view.precompute_visualizations(), memory),
+            voxels * len(simulation.states))
+
+    return {
+        "preset": preset_name,
+        "engine": engine_name,
+        "grid_size": list(grid_size),
+        "voxels": voxels,
+        "days": days,
+        "stages": stages,
+    }
+
+
+def get_commit():
+    """
+    Get the current git commit of the repository, if available.
+
+    Returns:
+        str: Commit hash, or None outside a git checkout.
+    """
+    try:
+        return subprocess.run(
+            ["git", "rev-parse", "HEAD"], capture_output=True, text=True, check=True).stdout.strip()
+    except (OSError, subprocess.CalledProcessError):
+        return None
+
+
+def run_suite(presets, engines, sizes, days, seed=0, memory=True, display=True, equivalence=False,
+              atol=1e-6, rtol=1e-6):
+    """
+    Benchmark every combination of preset, engine option set and grid size.
+
+    Args:
+        equivalence (bool): Also check every engine but the reference against the reference engine; the
+            report is stored under "equivalence" in each case (see benchmarks.equivalence.compare_runs).
+        atol (float): Absolute tolerance of the equivalence checks.
+        rtol (float): Relative tolerance of the equivalence checks.
+
+    Returns:
+        dict: Run metadata ("commit", "python", "numpy", "days", "seed") and the list of case "results"
+            (see benchmark_case).
+    """
+    results = []
+    for preset_name in presets:
+        for size in sizes:
+            reference = None  # Reference run shared by the equivalence checks of this preset and size
+            for engine_name in engines:
+                logging.warning(f"Benchmarking {preset_name} / {engine_name} / {size}^3...")
+                case = benchmark_case(preset_name, engine_name, size, days, seed, memory, display)
+                if equivalence and engine_name != "reference":
+                    grid_size = (size, size, size)
+                    if reference is None:
+                        reference = run_preset(preset_name, days, grid_size, seed)
+                    case["equivalence"] = check_equivalence(
+                        preset_name, ENGINES[engine_name], grid_size, days, seed, atol, rtol, reference)
+                results.append(case)
+    return {
+        "commit": get_commit(),
+        "python": platform.python_version(),
+        "numpy": np.__version__,
+        "days": days,
+        "seed": seed,
+        "results": results,
+    }
+
+
+def compare_results(baseline, current):
+    """
+    Compute the speedup of every stage of `current` over the matching case of `baseline`.
+
+    Args:
+        baseline (dict): Suite results of the reference commit (see run_suite).
+        current (dict): Suite results to compare.
+
+    Returns:
+        dict: (preset, engine, grid edge) -> {stage: baseline seconds / current seconds}, for the cases and
+            stages present in both.
+    """
+    def key(case):
+        return case["preset"], case["engine"], case["grid_size"][0]
+
+    baseline_cases = {key(case): case for case in baseline["results"]}
+    speedups = {}
+    for case in current["results"]:
+        reference = baseline_cases.get(key(case))
+        if reference is None:
+            continue
+        speedups[key(case)] = {
+            stage: reference["stages"][stage]["seconds"] / timing["seconds"]
+            for stage, timing in case["stages"].items()
+            if stage in reference["stages"] and timing["seconds"] > 0
+        }
+    return speedups
+
+
+def print_results(suite, speedups=None):
+    """
+    Print the suite results as a table, with speedups over a baseline when given.
+    """
+    print(f"commit {suite['commit']}, {suite['days']} days, seed {suite['seed']}")
+    header = f"{'preset':<28}{'engine':<16}{'grid':>6}  {'stage':<31}{'seconds':>10}{'voxels/s':>12}{'peak MiB':>10}"
+    if speedups is not None:
+        header += f"{'speedup':>9}"
+    print(header)
+    for case in suite["results"]:
+        case_key = (case["preset"], case["engine"], case["grid_size"][0])
+        for stage, timing in case["stages"].items():
+            peak = f"{timing['peak_bytes'] / 2 ** 20:.1f}" if timing["peak_bytes"] is not None else "-"
+            rate = f"{timing['voxels_per_second']:.0f}" if timing["voxels_per_second"] else "-"
+            line = (f"{case['preset'][:27]:<28}{case['engine']:<16}{case['grid_size'][0]:>5}³  {stage:<31}"
+                    f"{timing['seconds']:>10.3f}{rate:>12}{peak:>10}")
+            if speedups is not None:
+                speedup = speedups.get(case_key, {}).get(stage)
+                line += f"{speedup:>8.2f}x" if speedup is not None else f"{'-':>9}"
+            print(line)
+
+    checked = [case for case in suite["results"] if "equivalence" in case]
+    if checked:
+        print()
+        print("Equivalence with the reference engine (precompute speedup over the reference engine of this run):")
+        reference_seconds = {
+            (case["preset"], case["grid_size"][0]): case["stages"]["precompute"]["seconds"]
+            for case in suite["results"] if case["engine"] == "reference"
+        }
+        for case in checked:
+            seconds = reference_seconds.get((case["preset"], case["grid_size"][0]))
+            speedup = f"{seconds / case['stages']['precompute']['seconds']:.2f}x" if seconds else "-"
+            print(f"{case['preset'][:27]:<28}{case['engine']:<16}{case['grid_size'][0]:>5}³  {speedup:>7}  "
+                  f"{describe(case['equivalence'])}")
+
+
+def main():
+    default_name = next(name for name, preset in PRESET_CONFIGS.items() if preset is DEFAULT_PRESET)
+    parser = argparse.ArgumentParser(description="Benchmark the engine across grid sizes, presets and engines.")
+    parser.add_argument("--sizes", default=",".join(map(str, DEFAULT_GRID_SIZES)),
+                        help=f"Comma-separated cubic grid edges (the suite covers {', '.join(map(str, GRID_SIZES))}).")
+    parser.add_argument("--presets", nargs="+", default=[default_name], choices=sorted(PRESET_CONFIGS),
+                        help="Presets to run.")
+    parser.add_argument("--engines", nargs="+", default=list(ENGINES), choices=list(ENGINES),
+                        help="Engine option sets to run.")
+    parser.add_argument("--days", type=int, default=3, help="Days simulated by the precompute stage.")
+    parser.add_argument("--seed", type=int, default=0, help="Random seed shared by all stages.")
+    parser.add_argument("--output", default="benchmark_results.json", help="JSON file to write the results to.")
+    parser.add_argument("--compare", default=None, help="JSON results of a previous run to compute speedups against.")
+    parser.add_argument("--no-memory", action="store_true", help="Skip the peak memory runs.")
+    parser.add_argument("--skip-display", action="store_true", help="Skip the precompute_visualizations stage.")
+    parser.add_argument("--check-equivalence", action="store_true",
+                        help="Check every engine against the reference engine.")
+    parser.add_argument("--atol", type=float, default=1e-6, help="Absolute tolerance of the equivalence checks.")
+    parser.add_argument("--rtol", type=float, default=1e-6, help="Relative tolerance of the equivalence checks.")
+    args = parser.parse_args()
+
+    sizes = [int(size) for size in args.sizes.split(",")]
+    suite = run_suite(args.presets, args.engines, sizes, args.days, args.seed,
+                      memory=not args.no_memory, display=not args.skip_display,
+                      equivalence=args.check_equivalence, atol=args.atol, rtol=args.rtol)
+    with open(args.output, "w") as file:
+        json.dump(suite, file, indent=2)
+
+    speedups = None
+    if args.compare:
+        with open(args.compare) as file:
+            speedups = compare_results(json.load(file), suite)
+    print_results(suite, speedups)
+    print(f"Results written to {args.output}")
+
+
+if __name__ == "__main__":
+    main()
@@ -0,0 +1,136 @@
+class Neighborhood(list):
+    """
+    The neighboring particles of a cell, split by elevation relative to that cell into below, aligned
+    (same elevation) and above groups, with optional per-group counts of each cell type.
+
+    The counts are computed once per step for the whole grid (see fields.count_neighbor_types), so the
+    Particle predicates can look them up instead of scanning the particles. A Neighborhood built from the
+    fixed neighbor slots (-x, +x, -y, +y, -z, +z) also knows its groups up front: below and above are the
+    -z and +z slots, so Particle.get_below_neighbors and friends do not need to filter anything.
+    A Neighborhood behaves like the plain list of particles it wraps everywhere else.
+    """
+    BELOW, ALIGNED, ABOVE = 0, 1, 2
+    # Slot order of fixed-slot neighborhoods, matching fields.NEIGHBOR_OFFSETS
+    SLOT_NAMES = ("-x", "+x", "-y", "+y", "-z", "+z")
+
+    def __init__(self, particles, group_counts=None, groups=None, slots=None):
+        """
+        Initialize the Neighborhood class.
+
+        Args:
+            particles (iterable): The neighboring particles.
+            group_counts (list, optional): Three lists (below, aligned, above) holding the number of neighbors of each cell type.
+            groups (tuple, optional): The neighbors of each group (below, aligned, above), if known.
+            slots (tuple, optional): The neighbor in each of the six slots, or None where there is none.
+        """
+        super().__init__(particles)
+        self.group_counts = group_counts
+        self.groups = groups
+        self.slots = slots
+        self._selected_groups = None
+
+    @classmethod
+    def from_slots(cls, slots, group_counts=None):
+        """
+        Create a neighborhood from the fixed neighbor slots of a cell whose neighbors all sit at their grid positions.
+
+        Args:
+            slots (tuple): The neighbor in each slot (-x, +x, -y, +y, -z, +z), or None if the slot is empty.
+            group_counts (list, optional): Per-group cell type counts (see __init__).
+
+        Returns:
+            Neighborhood: The neighbors, in slot order, with their groups.
+        """
+        below = [slots[4]] if slots[4] is not None else []
+        above = [slots[5]] if slots[5] is not None else []
+        aligned = [particle for particle in slots[:4] if particle is not None]
+        return cls(aligned + below + above, group_counts, groups=(below, aligned, above), slots=slots)
+
+    @property
+    def valid(self):
+        """
+        tuple: One flag per slot (-x, +x, -y, +y, -z, +z) telling whether it holds a neighbor.
+        """
+        return tuple(particle is not None for particle in self.slots) if self.slots is not None else None
+
+    def count_types(self, cell_types, groups=(BELOW, ALIGNED, ABOVE)):
+        """
+        Count the neighbors of the given cell types.
+
+        Args:
+            cell_types (iterable): Cell types to count.
+            groups (tuple): Elevation groups to count in (Neighborhood.BELOW, ALIGNED and/or ABOVE).
+
+        Returns:
+            int: Number of matching neighbors.
+        """
+        if self.group_counts is not None:
+            return sum(self.group_counts[group][cell_type] for group in groups for cell_type in cell_types)
+        return sum(n.cell_type in cell_types for group in groups for n in self.groups[group])
+
+    def select_group(self, group, predicate):
+        """
+        Get the sub-neighborhood of one elevation group.
+
+        Args:
+            group (int): Elevation group (Neighborhood.BELOW, ALIGNED or ABOVE).
+            predicate (callable): Tells whether a neighbor belongs to the group; only used when the groups are not known.
+
+        Returns:
+            Neighborhood: The neighbors in that group, in their original order, with their counts.
+        """
+        if self._selected_groups is None:
+            self._selected_groups = {}
+        if group not in self._selected_groups:
+            particles = self.groups[group] if self.groups is not None else [n for n in self if predicate(n)]
+            group_counts = None
+            if self.group_counts is not None:
+                type_count = len(self.group_counts[group])
+                group_counts = [[0] * type_count, [0] * type_count, [0] * type_count]
+                group_counts[group] = self.group_counts[group]
+            groups = None
+            if self.groups is not None:
+                groups = tuple(particles if index == group else [] for index in range(3))
+            self._selected_groups[group] = Neighborhood(particles, group_counts, groups)
+        return self._selected_groups[group]
+
+    def exclude_type(self, cell_type):
+        """
+        Create the neighborhood without the neighbors of one cell type.
+
+        Args:
+            cell_type (int): Cell type to leave out (e.g. Vacuum).
+
+        Returns:
+            Neighborhood: The remaining neighbors with their counts.
+        """
+        if all(n.cell_type != cell_type for n in self):
+            return self
+        group_counts = None
+        if self.group_counts is not None:
+            group_counts = [list(counts) for counts in self.group_counts]
+            for counts in group_counts:
+                counts[cell_type] = 0
+        if self.slots is not None:
+            slots = tuple(None if n is None or n.cell_type == cell_type else n for n in self.slots)
+            return Neighborhood.from_slots(slots, group_counts)
+        groups = None
+        if self.groups is not None:
+            groups = tuple([n for n in members if n.cell_type != cell_type] for members in self.groups)
+        return Neighborhood((n for n in self if n.cell_type != cell_type), group_counts, groups)
+
+    def __add__(self, other):
+        if not isinstance(other, Neighborhood):
+            return list(self) + list(other)
+        group_counts = None
+        if self.group_counts is not None and other.group_counts is not None:
+            group_counts = [
+                [a + b for a, b in zip(own, others)]
+                for own, others in zip(self.group_counts, other.group_counts)
+            ]
+        groups = None
+        if self.groups is not None and other.groups is not None:
+            groups = tuple(own + others for own, others in zip(self.groups, other.groups))
+        if group_counts is None and groups is None:
+            return list(self) + list(other)
+        return Neighborhood(list(self) + list(other), group_counts, groups)
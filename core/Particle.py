@@ -1,15 +1,40 @@
 from config.Config import config_instance 
+from .Neighborhood import Neighborhood
 import math
 import logging
 
+class ParticleFlyweight:
+    """
+    Immutable data shared by all the particles of a world: the configuration and the grid size.
+    """
+    __slots__ = ("config", "grid_size")
+
+    def __init__(self, config, grid_size):
+        """
+        Initializes a ParticleFlyweight object.
+
+        Args:
+            config (dict): Configuration shared by the particles.
+            grid_size (tuple): Dimensions of the simulation grid (x_max, y_max, z_max).
+        """
+        self.config = config
+        self.grid_size = grid_size
+
+
 class Particle:
     """
     Represents a single particle (or cell) in the simulation grid. Each particle has attributes such as type,
     temperature, water mass, pollution level, direction, position, and the grid size.
 
+    Particles use __slots__ and keep the configuration and grid size in a ParticleFlyweight shared with
+    the other particles of the same world, so that a particle only stores its own state.
+
     This class provides methods for updating particle state, calculating movement, and visualizing the particle.
     """
-    def __init__(self, cell_type, temperature, water_mass, pollution_level, direction, position, grid_size):
+    __slots__ = ("cell_type", "temperature", "water_mass", "pollution_level", "direction", "position", "shared")
+    _last_shared = None  # Flyweight of the most recently created particle, reused while the world stays the same
+
+    def __init__(self, cell_type, temperature, water_mass, pollution_level, direction, position, grid_size, config=None):
         """
         Initializes a Particle object with specified attributes.
 
@@ -21,6 +46,7 @@ class Particle:
             direction (tuple): Direction of movement as a 3D vector (dx, dy, dz).
             position (tuple): Current position of the cell in the grid (x, y, z).
             grid_size (tuple): Dimensions of the simulation grid (x_max, y_max, z_max).
+            config (dict, optional): Configuration shared with the owning World. Defaults to the global configuration.
         """
         self.cell_type = cell_type
         self.temperature = temperature
@@ -28,29 +54,64 @@ class Particle:
         self.pollution_level = pollution_level
         self.direction = direction
         self.position = position  # Particle's current position in the grid
-        self.grid_size = grid_size  # Grid boundaries to manage particle movement
-        self.config = config_instance.get()  # Access the centralized configuration
+        # Share the owning World's configuration and grid boundaries, falling back to the centralized configuration
+        self.shared = Particle.get_flyweight(config if config is not None else config_instance.get(), grid_size)
+
+    @staticmethod
+    def get_flyweight(config, grid_size):
+        """
+        Get the flyweight holding the given configuration and grid size, reusing the last one when it matches.
+
+        Args:
+            config (dict): Configuration shared by the particles.
+            grid_size (tuple): Dimensions of the simulation grid (x_max, y_max, z_max).
+
+        Returns:
+            ParticleFlyweight: The shared data.
+        """
+        shared = Particle._last_shared
+        if shared is None or shared.config is not config or shared.grid_size != grid_size:
+            shared = ParticleFlyweight(config, grid_size)
+            Particle._last_shared = shared
+        return shared
+
+    @property
+    def config(self):
+        """
+        dict: Configuration shared with the owning World.
+        """
+        return self.shared.config
+
+    @property
+    def grid_size(self):
+        """
+        tuple: Grid boundaries used to manage particle movement.
+        """
+        return self.shared.grid_size
 
     ####################################################################################################################
     ###################################### CLASS UTILS #################################################################
     ####################################################################################################################
 
-    def clone(self):
+    def clone(self, config=None):
         """
         Creates a copy of the current particle with identical attributes.
 
+        Args:
+            config (dict, optional): Configuration for the copy. Defaults to the current particle's configuration.
+
         Returns:
             Particle: A new Particle object with the same state as the current one.
         """
-        return Particle(
-            cell_type=self.cell_type,
-            temperature=self.temperature,
-            water_mass=self.water_mass,
-            pollution_level=self.pollution_level,
-            direction=self.direction,
-            position=self.position,
-            grid_size=self.grid_size
-        )
+        copy = Particle.__new__(Particle)
+        copy.cell_type = self.cell_type
+        copy.temperature = self.temperature
+        copy.water_mass = self.water_mass
+        copy.pollution_level = self.pollution_level
+        copy.direction = self.direction
+        copy.position = self.position
+        copy.shared = self.shared if config is None else Particle.get_flyweight(config, self.grid_size)
+        return copy
 
     def get_next_position(self):
         """
@@ -231,7 +292,10 @@ class Particle:
         new_cell = self.clone()
         if new_cell.is_vacuum_cell() == False:
             # Apply natural decay processes
-            neighbors = [n for n in neighbors if not n.is_vacuum_cell()]
+            if isinstance(neighbors, Neighborhood):
+                neighbors = neighbors.exclude_type(8)
+            else:
+                neighbors = [n for n in neighbors if not n.is_vacuum_cell()]
             new_cell._apply_natural_decay(neighbors)
             new_cell.equilibrate_temperature(neighbors)
             new_cell.equilibrate_pollution_level(neighbors)
@@ -897,7 +961,7 @@ class Particle:
         Returns:
             bool: True if the majority of neighbors are of type Sea (cell_type 0) or Ice (cell_type 3).
         """
-        return sum(n.cell_type in {0, 3} for n in neighbors) > len(neighbors) // 2
+        return self.count_neighbor_types(neighbors, {0, 3}) > len(neighbors) // 2
 
     def is_surrounded_by_land_cells(self, neighbors):
         """
@@ -909,7 +973,7 @@ class Particle:
         Returns:
             bool: True if all neighbors are of type Desert (1), Forest (4), City (5), Air (6), or Vacuum (8).
         """
-        return sum(n.cell_type in {1, 4, 5} for n in neighbors) == len(neighbors)
+        return self.count_neighbor_types(neighbors, {1, 4, 5}) == len(neighbors)
 
     def is_surrounded_by_desert_cells(self, neighbors):
         """
@@ -921,7 +985,7 @@ class Particle:
         Returns:
             bool: True if all neighbors are of type Desert (cell_type 1).
         """
-        return sum(n.cell_type in {1} for n in neighbors) == len(neighbors)
+        return self.count_neighbor_types(neighbors, {1}) == len(neighbors)
 
     def is_surrounded_by_forests_cells(self, neighbors):
         """
@@ -933,7 +997,7 @@ class Particle:
         Returns:
             bool: True if all neighbors are of type Forest (cell_type 4).
         """
-        return sum(n.cell_type in {4} for n in neighbors) == len(neighbors)
+        return self.count_neighbor_types(neighbors, {4}) == len(neighbors)
 
     def is_surrounded_by_city_cells(self, neighbors):
         """
@@ -945,7 +1009,7 @@ class Particle:
         Returns:
             bool: True if all neighbors are of type City (cell_type 5).
         """
-        return sum(n.cell_type in {5} for n in neighbors) == len(neighbors)
+        return self.count_neighbor_types(neighbors, {5}) == len(neighbors)
 
     def is_surrounded_by_cloud_cells(self, neighbors):
         """
@@ -957,7 +1021,7 @@ class Particle:
         Returns:
             bool: True if all neighbors are of type Cloud (cell_type 2).
         """
-        return sum(n.cell_type in {2} for n in neighbors) == len(neighbors)
+        return self.count_neighbor_types(neighbors, {2}) == len(neighbors)
 
     def is_surrounded_by_air_cells(self, neighbors):
         """
@@ -969,7 +1033,7 @@ class Particle:
         Returns:
             bool: True if all neighbors are of type Air (cell_type 6).
         """
-        return sum(n.cell_type in {6} for n in neighbors) == len(neighbors)
+        return self.count_neighbor_types(neighbors, {6}) == len(neighbors)
 
     def is_surrounded_by_cell_types(self, neighbors, cell_types):
         """
@@ -982,7 +1046,23 @@ class Particle:
         Returns:
             bool: True if all neighbors belong to the specified cell types.
         """
-        return all(n.cell_type in cell_types for n in neighbors)
+        return self.count_neighbor_types(neighbors, cell_types) == len(neighbors)
+
+    def count_neighbor_types(self, neighbors, cell_types):
+        """
+        Count the neighbors of the given cell types, looking the counts up when the neighbors
+        come as a Neighborhood with precomputed counts.
+
+        Args:
+            neighbors (list of Particle): List of neighboring particles to evaluate.
+            cell_types (set): Set of target cell types to count.
+
+        Returns:
+            int: Number of neighbors of the given cell types.
+        """
+        if isinstance(neighbors, Neighborhood):
+            return neighbors.count_types(cell_types)
+        return sum(n.cell_type in cell_types for n in neighbors)
 
     def is_below_sea_level(self, neighbors):
         """
@@ -995,6 +1075,8 @@ class Particle:
             bool: True if the cell's elevation is lower than all sea-level neighbors
                 (Sea (cell_type 0) or Ice (cell_type 3)).
         """
+        if isinstance(neighbors, Neighborhood):
+            return neighbors.count_types({0, 3}, groups=(Neighborhood.BELOW, Neighborhood.ALIGNED)) == 0
         return all(self.position[2] < n.position[2] for n in neighbors if n.cell_type in {0, 3})
 
     def is_below_ground_level(self, neighbors):
@@ -1008,6 +1090,8 @@ class Particle:
             bool: True if the cell's elevation is lower than all ground-level neighbors
                 (Desert (1), Forest (4), or City (5)).
         """
+        if isinstance(neighbors, Neighborhood):
+            return neighbors.count_types({1, 4, 5}, groups=(Neighborhood.BELOW, Neighborhood.ALIGNED)) == 0
         return all(self.position[2] < n.position[2] for n in neighbors if n.cell_type in {1, 4, 5})
 
     def get_above_neighbors(self, neighbors):
@@ -1020,6 +1104,8 @@ class Particle:
         Returns:
             list of Particle: Neighbors located at a higher elevation than the current cell.
         """
+        if isinstance(neighbors, Neighborhood):
+            return neighbors.select_group(Neighborhood.ABOVE, lambda n: n.position[2] > self.position[2])
         return [n for n in neighbors if n.position[2] > self.position[2]]
 
     def get_below_neighbors(self, neighbors):
@@ -1032,6 +1118,8 @@ class Particle:
         Returns:
             list of Particle: Neighbors located at a lower elevation than the current cell.
         """
+        if isinstance(neighbors, Neighborhood):
+            return neighbors.select_group(Neighborhood.BELOW, lambda n: n.position[2] < self.position[2])
         return [n for n in neighbors if n.position[2] < self.position[2]]
 
     def get_aligned_neighbors(self, neighbors):
@@ -1044,6 +1132,8 @@ class Particle:
         Returns:
             list of Particle: Neighbors located at the same elevation as the current cell.
         """
+        if isinstance(neighbors, Neighborhood):
+            return neighbors.select_group(Neighborhood.ALIGNED, lambda n: n.position[2] == self.position[2])
         return [n for n in neighbors if n.position[2] == self.position[2]]
 
     def is_ocean_cell_below(self, neighbors):
@@ -1099,10 +1189,11 @@ class Particle:
         is_extremely_dry = self.water_mass < water_mass_threshold
         is_near_pristine = self.pollution_level < pollution_level_threshold
         is_stationary = self.direction == (0, 0, 0)
-        is_isolated = all(
-            self.config["cell_type_pollution_transfer_weights"].get(neighbor.cell_type, 0.0) == isolation_threshold
-            for neighbor in neighbors
-        )
+        transferring_types = {
+            cell_type for cell_type, weight in self.config["cell_type_pollution_transfer_weights"].items()
+            if weight != isolation_threshold
+        }
+        is_isolated = self.count_neighbor_types(neighbors, transferring_types) == 0
 
         return (
             is_extremely_cold and
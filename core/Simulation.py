@@ -1,7 +1,28 @@
 from core.World import World  # Import the World class
+from core.WorldSnapshot import WorldSnapshot
+from config.Config import config_instance
+from concurrent.futures import ProcessPoolExecutor
+import csv
+import json
 import logging
+import time
 import numpy as np
 
+
+def _precompute_branch(branch):
+    """
+    Run a forked branch to completion. Defined at module level so it can be sent to worker processes.
+
+    Args:
+        branch (Simulation): The branch to precompute.
+
+    Returns:
+        Simulation: The precomputed branch.
+    """
+    branch.precompute()
+    return branch
+
+
 class Simulation:
     """
     The Simulation class is responsible for managing the lifecycle of a simulation,
@@ -9,7 +30,7 @@ class Simulation:
     and analyzing results.
     """
 
-    def __init__(self, grid_size, initial_ratios, days):
+    def __init__(self, grid_size, initial_ratios, days, config=None):
         """
         Initialize the Simulation class with initial conditions.
 
@@ -17,11 +38,19 @@ class Simulation:
             grid_size (tuple): Dimensions of the grid (x, y, z).
             initial_ratios (dict): Initial ratios for different cell types (e.g., forest, city, desert).
             days (int): Number of days to run the simulation.
+            config (dict, optional): Configuration used by every World of this run. Defaults to the global configuration.
         """
         self.grid_size = grid_size
         self.initial_ratios = initial_ratios
         self.days = days
+        self.config = config if config is not None else config_instance.get()
+        self.fork_day = None  # Day this simulation was forked from (None for root simulations)
+        self.steady_state_day = None  # Day a fixed point or cycle was detected (see precompute)
+        self.steady_state_period = None  # Period of the detected cycle (1 for a fixed point)
         self.states = []  # Store the history of World objects (one per day)
+        self.first_stored_day = 0  # Earlier days were dropped from `states` (None) by the "history_limit" option
+        self.phase_timings = []  # Per-day phase timing records (only filled with the "profile_phases" option)
+        self.transition_counts = []  # Per-day (from, to) cell type transition counts (only with "rule_statistics")
         # Aggregates to track various metrics over time
         self.pollution_over_time = []  # Average pollution over time
         self.temperature_over_time = []  # Average temperature over time
@@ -45,40 +74,404 @@ class Simulation:
 
 
 
-    def precompute(self):
+    def precompute(self, detect_steady_state=False, max_cycle_period=10, decimals=6, strict=False, verification_cycles=3):
         """
         Run the simulation for the specified number of days and precompute all states.
         This function initializes the grid and iteratively updates it for each day.
+        Forked simulations resume from the last state they share with their parent.
 
         Steps:
-        1. Initialize the first state (Day 0).
-        2. For each day, clone the last state, update it, and store it.
+        1. Initialize the first state (Day 0), unless states already exist.
+        2. For each remaining day, clone the last state, update it, and store it. With the "compact_history"
+           option, every state but the latest is stored as a bit-packed WorldSnapshot.
         3. Update aggregates for analysis.
+        4. Optionally stop once the grid reaches a fixed point or a short cycle, and fast-forward the rest.
+
+        Args:
+            detect_steady_state (bool): Compare hashed per-day field arrays to detect fixed points and
+                short cycles, then extrapolate the remaining days from the cycle (see _fast_forward).
+                Defaults to False.
+            max_cycle_period (int): Longest cycle (in days) to detect. A period of 1 is a fixed point.
+            decimals (int): Decimals kept for temperature, water mass and pollution when hashing states.
+            strict (bool): Verify a detected cycle by simulating `verification_cycles` more periods
+                before fast-forwarding. Defaults to False.
+            verification_cycles (int): Number of periods simulated for verification in strict mode.
+
+        Raises:
+            ValueError: If steady-state detection is combined with a "history_limit" shorter than
+                `max_cycle_period`, since fast-forwarding repeats states from one period back.
+        """
+        history_limit = self.config.get("history_limit")
+        if detect_steady_state and history_limit and history_limit < max_cycle_period:
+            raise ValueError(
+                f"history_limit ({history_limit}) must be at least max_cycle_period ({max_cycle_period}) "
+                "to detect steady states.")
+        if not self.states:
+            self._initialize()
+
+        day = len(self.states) - 1
+        hashes_by_day = {}  # Day -> state hash
+        last_day_by_hash = {}  # State hash -> most recent day with that hash
+        candidate = None  # (detection day, period) of a cycle awaiting verification
+        if detect_steady_state:
+            state_hash = self.states[-1].compute_state_hash(decimals)
+            hashes_by_day[day] = state_hash
+            last_day_by_hash[state_hash] = day
+
+        # # Simulate for the specified number of days
+        while day < self.days:
+            next_state = self._advance()
+            day += 1
+
+            if not detect_steady_state:
+                continue
+
+            state_hash = next_state.compute_state_hash(decimals)
+            if candidate is None:
+                previous_day = last_day_by_hash.get(state_hash)
+                if previous_day is not None and day - previous_day <= max_cycle_period:
+                    candidate = (day, day - previous_day)
+                    logging.info(f"Possible cycle of period {candidate[1]} detected on day {day}.")
+            elif state_hash != hashes_by_day[day - candidate[1]]:
+                logging.info(f"Cycle detected on day {candidate[0]} was not confirmed on day {day}.")
+                candidate = None
+            hashes_by_day[day] = state_hash
+            last_day_by_hash[state_hash] = day
+
+            if candidate and (not strict or day >= candidate[0] + verification_cycles * candidate[1]):
+                self._fast_forward(*candidate)
+                break
+        
+        self.print_simulation_metrics()
+
+    def step(self):
         """
-        # Initialize the first state (Day 0)
+        Advance the simulation by a single day, on demand (e.g. from the GUI's play and step controls).
+        Unlike precompute, this is not bounded by the `days` horizon.
+
+        Returns:
+            int: The day reached (0 if the simulation had no state yet).
+        """
+        if not self.states:
+            self._initialize()
+        else:
+            self._advance()
+        return len(self.states) - 1
+
+    def get_stored_state(self, day):
+        """
+        Get the state of a day, or that of the oldest stored day if it already left the history ring (see the
+        "history_limit" option). Safe to call from another thread while the simulation advances.
+
+        Args:
+            day (int): The requested day, which must have been simulated.
+
+        Returns:
+            tuple: The day actually returned and its state.
+        """
+        while True:
+            stored_day = max(day, self.first_stored_day)
+            state = self.states[stored_day]
+            if state is not None:
+                return stored_day, state
+
+    def _initialize(self):
+        """
+        Create and store the first state (Day 0) and its aggregates.
+        """
+        profile_phases = self.config.get("profile_phases", False)
+        if profile_phases:
+            started = time.perf_counter()
         initial_state = World(
             grid_size=self.grid_size,
             initial_ratios=self.initial_ratios,
-            day_number=0
+            day_number=0,
+            config=self.config
         )
         initial_state.initialize_grid()
         self.states.append(initial_state)
+        if profile_phases:
+            initialized = time.perf_counter()
         self._update_aggregates(initial_state)  # Update aggregates for Day 0
+        if profile_phases:
+            finished = time.perf_counter()
+            self.phase_timings.append({
+                "day": 0,
+                "initialize": initialized - started,
+                "aggregates": finished - initialized,
+                "total": finished - started
+            })
 
-        # # Simulate for the specified number of days
-        for day in range(self.days):
-            logging.info(f"Pre-computing Day {day}...")
-
-            # Compute the next state by cloning the current state
-            next_state = self.states[-1].clone()
-            next_state.day_number += 1  # Increment the day number
-            next_state.update_cells_on_grid()  # Update the grid cells
-            next_state._recalculate_global_attributes()  # Recalculate global attributes
-            self.states.append(next_state)  # Store the new state
-            self._update_aggregates(next_state)  # Update aggregates
-        
-        self.print_simulation_metrics()
+    def _advance(self):
+        """
+        Compute the day after the last stored state, store it and update the aggregates.
+
+        With the "compact_history" option, the previous state is packed into a WorldSnapshot. With the
+        "history_limit" option, only that many of the latest states are kept: the state leaving this history ring
+        is replaced by None, so day numbers remain valid indices into `states` (see first_stored_day).
+
+        Returns:
+            World: The new state.
+        """
+        profile_phases = self.config.get("profile_phases", False)
+        compact_history = self.config.get("compact_history", False)
+        day = len(self.states) - 1
+        logging.info(f"Pre-computing Day {day}...")
+
+        if profile_phases:
+            started = time.perf_counter()
+        # Compute the next state by cloning the current state (the shared state itself is never mutated)
+        next_state = self.states[-1].clone(config=self.config)
+        next_state.day_number = day + 1  # Increment the day number
+        if profile_phases:
+            cloned = time.perf_counter()
+        next_state.update_cells_on_grid()  # Update the grid cells
+        if profile_phases:
+            updated = time.perf_counter()
+        next_state._recalculate_global_attributes()  # Recalculate global attributes
+        if profile_phases:
+            recalculated = time.perf_counter()
+        if compact_history and isinstance(self.states[-1], World):
+            # Only the latest day is needed as a World to continue; earlier days are packed
+            self.states[-1] = WorldSnapshot(self.states[-1])
+        self.states.append(next_state)  # Store the new state
+        self._trim_history()
+        if profile_phases:
+            compacted = time.perf_counter()
+        self._update_aggregates(next_state)  # Update aggregates
+
+        if profile_phases:
+            finished = time.perf_counter()
+            self._record_phase_timings(day + 1, next_state.phase_timings, {
+                "clone": cloned - started,
+                "global_attributes": recalculated - updated,
+                "compact_history": compacted - recalculated,
+                "aggregates": finished - compacted,
+                "total": finished - started
+            })
+        return next_state
+
+    def _trim_history(self):
+        """
+        Drop the oldest states beyond the "history_limit" option, if set.
+        """
+        history_limit = self.config.get("history_limit")
+        while history_limit and len(self.states) - history_limit > self.first_stored_day:
+            # first_stored_day moves first, so that a reader running in another thread which finds a None state
+            # sees the new first stored day (see get_stored_state)
+            self.first_stored_day += 1
+            self.states[self.first_stored_day - 1] = None
+
+    def _fast_forward(self, detection_day, period):
+        """
+        Fill the remaining days by repeating the detected cycle instead of simulating them.
+        Extrapolated days reference the World objects of the cycle, so their aggregates repeat too. Their
+        `day_number` is therefore the day of the cycle state they repeat; use the index in `states` as the day.
+
+        Args:
+            detection_day (int): The day on which the cycle was first observed.
+            period (int): Length of the cycle in days (1 for a fixed point).
+        """
+        first_skipped_day = len(self.states)
+        for day in range(first_skipped_day, self.days + 1):
+            state = self.states[day - period]
+            self.states.append(state)
+            self._trim_history()
+            self._update_aggregates(state)
+
+        self.steady_state_day = detection_day
+        self.steady_state_period = period
+        logging.info(
+            f"Steady state (cycle period {period}) detected on day {detection_day}; "
+            f"fast-forwarded days {first_skipped_day}-{self.days}.")
+
+    def fork(self, day, overrides=None):
+        """
+        Create a branch that continues this simulation from a precomputed day with modified configuration.
 
+        The branch shares the World objects of days 0..day with this simulation instead of copying them.
+        Precomputed states are never mutated (each new day starts from a clone), so the shared history
+        behaves as copy-on-write: the branch's first step clones the day-N state with its own configuration.
+
+        Args:
+            day (int): The precomputed day to fork from.
+            overrides (dict, optional): Configuration values to change in the branch
+                (e.g. {"city_pollution_generation_rate": 1.2}).
+
+        Returns:
+            Simulation: The new branch. Call precompute() (or run_branches()) to simulate the remaining days.
+
+        Raises:
+            ValueError: If the day has not been precomputed yet.
+        """
+        if not self.first_stored_day <= day < len(self.states):
+            raise ValueError(
+                f"Cannot fork from day {day}: only days {self.first_stored_day}-{len(self.states) - 1} are stored.")
+
+        branch_config = dict(self.config)
+        branch_config.update(overrides or {})
+
+        branch = Simulation(
+            grid_size=self.grid_size,
+            initial_ratios=self.initial_ratios,
+            days=self.days,
+            config=branch_config
+        )
+        branch.fork_day = day
+        branch.states = self.states[:day + 1]  # Shared World objects, not copies
+        branch.first_stored_day = self.first_stored_day
+
+        # Copy the aggregate prefix so temporal statistics continue seamlessly
+        for name, value in vars(self).items():
+            if name.endswith("_over_time"):
+                if isinstance(value, dict):
+                    setattr(branch, name, {key: series[:day + 1] for key, series in value.items()})
+                else:
+                    setattr(branch, name, value[:day + 1])
+        branch.transition_counts = self.transition_counts[:day + 1]
+
+        return branch
+
+    @staticmethod
+    def run_branches(branches, parallel=False, max_workers=None):
+        """
+        Precompute several forked branches, optionally in parallel worker processes.
+
+        When running in parallel, only the fork-day state is sent to each worker; the shared
+        prefix history is reattached to the results afterwards so it is still not duplicated.
+
+        Args:
+            branches (list of Simulation): Branches created by fork().
+            parallel (bool): Whether to run the branches in separate processes. Defaults to False.
+            max_workers (int, optional): Maximum number of worker processes. Defaults to the CPU count.
+
+        Returns:
+            list of Simulation: The precomputed branches, in the same order.
+        """
+        if not parallel:
+            for branch in branches:
+                branch.precompute()
+            return list(branches)
+
+        # Detach the shared prefix so it is not pickled for every worker (placeholders keep the day count)
+        prefixes = []
+        for branch in branches:
+            prefixes.append(branch.states)
+            branch.states = [None] * (len(branch.states) - 1) + branch.states[-1:]
+
+        try:
+            with ProcessPoolExecutor(max_workers=max_workers) as executor:
+                results = list(executor.map(_precompute_branch, branches))
+        finally:
+            for branch, prefix in zip(branches, prefixes):
+                branch.states = prefix
+
+        # The worker's copy of the fork-day state is replaced by the shared original
+        for result, prefix in zip(results, prefixes):
+            result.states = prefix + result.states[len(prefix):]
+        return results
+
+    def compare_series(self, other, atol=0.0, rtol=0.0):
+        """
+        Compare every `*_over_time` series of this simulation with those of another one
+        (e.g. the same preset run at a different precision or with different engine options).
+
+        Args:
+            other (Simulation): The simulation to compare with. Only the days both have computed are compared.
+            atol (float): Absolute difference tolerated when looking for the first divergent day.
+            rtol (float): Difference tolerated relative to this simulation's values, on top of `atol`.
+
+        Returns:
+            dict: For each series (dict-valued series are split per key, e.g. "cell_type_counts_over_time[5]"),
+                a dict with the largest absolute difference ("max_abs_diff"), the largest difference relative
+                to the magnitude of this simulation's values, floored at `atol` and at float32 resolution
+                ("max_rel_diff", 0 for a series that is zero throughout when `atol` is 0), the difference on
+                the last compared day ("final_abs_diff") and the first day exceeding the tolerances
+                ("first_divergent_day", None if there is none).
+        """
+        pairs = []
+        for name, value in vars(self).items():
+            if not name.endswith("_over_time") or not hasattr(other, name):
+                continue
+            if isinstance(value, dict):
+                pairs.extend((f"{name}[{key}]", series, getattr(other, name).get(key, [])) for key, series in value.items())
+            else:
+                pairs.append((name, value, getattr(other, name)))
+
+        report = {}
+        for name, series, other_series in pairs:
+            days = min(len(series), len(other_series))
+            if days == 0:
+                continue
+            reference = np.asarray(series[:days], dtype=np.float64)
+            difference = np.abs(np.asarray(other_series[:days], dtype=np.float64) - reference)
+            # Values near zero are compared relative to the larger of `atol` and the float32 resolution of the
+            # series' magnitude, so that a zero reference does not blow the relative difference up
+            floor = max(atol, np.finfo(np.float32).eps * float(np.abs(reference).max()))
+            scale = np.maximum(np.abs(reference), floor)
+            relative = np.divide(difference, scale, out=np.zeros_like(difference), where=scale > 0)
+            divergent_days = np.flatnonzero(difference > atol + rtol * np.abs(reference))
+            report[name] = {
+                "max_abs_diff": float(difference.max()),
+                "max_rel_diff": float(relative.max()),
+                "final_abs_diff": float(difference[-1]),
+                "first_divergent_day": int(divergent_days[0]) if divergent_days.size else None,
+            }
+        return report
+
+    def _record_phase_timings(self, day, world_timings, step_timings):
+        """
+        Store the phase timing record of a simulated day.
+
+        Args:
+            day (int): The simulated day.
+            world_timings (dict): Seconds spent in each phase of World.update_cells_on_grid.
+            step_timings (dict): Seconds spent in the steps around it in precompute. Phases present in both
+                (the global attributes are recalculated by both) are added up.
+        """
+        record = {"day": day}
+        record.update(world_timings or {})
+        for name, seconds in step_timings.items():
+            record[name] = record.get(name, 0.0) + seconds
+        self.phase_timings.append(record)
+
+    def export_phase_timings(self, path):
+        """
+        Write the per-day phase timing records to a CSV file (one row per day, one column per phase)
+        or, for any other extension, a JSON file (a list of records).
+
+        Args:
+            path (str): Destination file path.
+
+        Raises:
+            ValueError: If no timings were recorded (the "profile_phases" option is off).
+        """
+        if not self.phase_timings:
+            raise ValueError("No phase timings were recorded; enable the 'profile_phases' option.")
+
+        if path.endswith(".csv"):
+            columns = list(dict.fromkeys(name for record in self.phase_timings for name in record))
+            with open(path, "w", newline="") as file:
+                writer = csv.DictWriter(file, fieldnames=columns, restval=0.0)
+                writer.writeheader()
+                writer.writerows(self.phase_timings)
+        else:
+            with open(path, "w") as file:
+                json.dump(self.phase_timings, file, indent=2)
+        logging.info(f"Phase timings of {len(self.phase_timings)} days written to {path}.")
+
+    def get_transition_matrix(self):
+        """
+        Get the cell type transitions produced by the rules, per day (requires the "rule_statistics" option).
+
+        Returns:
+            np.ndarray: (days, 10, 10) matrix; entry [d, a, b] is the number of type-a cells whose rule produced
+                type b on day d (day 0 is all zeros). Summing over the last axis gives the number of cells that
+                ran each `_update_*` rule per day.
+        """
+        if not self.transition_counts:
+            return np.zeros((0, 10, 10), dtype=np.int64)
+        return np.stack(self.transition_counts)
 
     def _update_aggregates(self, state):
         """
@@ -107,6 +500,10 @@ class Simulation:
             np.std(self.city_population_over_time) if len(self.city_population_over_time) > 1 else 0
         )
 
+        if self.config.get("rule_statistics", False):
+            counts = state.transition_counts
+            self.transition_counts.append(counts if counts is not None else np.zeros((10, 10), dtype=np.int64))
+
 
     def print_simulation_metrics(self):
         logging.info("\n===== Simulation Metrics =====\n")
@@ -128,5 +525,25 @@ class Simulation:
         logging.info(f"Standard Deviation of City Population: {self.std_dev_city_population_over_time}")
         logging.info(f"Forest Count Over Time: {self.forest_count_over_time}")
         logging.info(f"Standard Deviation of Forest Count: {self.std_dev_forest_count_over_time}\n")
-        
+
+        if self.transition_counts:
+            logging.info("** Rule Statistics (all days) **")
+            matrix = self.get_transition_matrix().sum(axis=0)
+            logging.info(f"Rule Runs Per Cell Type: {matrix.sum(axis=1).tolist()}")
+            conversions = [(int(matrix[a, b]), a, b) for a in range(10) for b in range(10) if a != b and matrix[a, b]]
+            for count, from_type, to_type in sorted(conversions, reverse=True):
+                logging.info(f"Type {from_type} -> {to_type}: {count}")
+            logging.info("")
+
+        if self.phase_timings:
+            logging.info("** Phase Timings (total seconds) **")
+            totals = {}
+            for record in self.phase_timings:
+                for name, seconds in record.items():
+                    if name != "day":
+                        totals[name] = totals.get(name, 0.0) + seconds
+            for name, seconds in totals.items():
+                logging.info(f"{name}: {seconds:.4f}")
+            logging.info("")
+
         logging.info("\n=================================\n")
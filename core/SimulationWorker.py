@@ -0,0 +1,114 @@
+import logging
+import math
+import queue
+import threading
+
+
+class SimulationWorker:
+    """
+    Advance a simulation in a background thread, one day at a time, and stream its days through a queue, so that
+    a display can show them and control the run while the simulation is still going.
+
+    The worker runs until it reaches a target day, initially the simulation's `days` horizon, then waits for
+    play(), step() or run_to_day() to move the target (pause() brings it back to the current day). The queue
+    receives ("day", day) once each day's state and aggregates are stored, ("paused", day) whenever the target is
+    reached, or ("error", exception) if the simulation fails. Consumers should only read the states and
+    aggregates of days announced on the queue, since later days may still be incomplete.
+    """
+
+    def __init__(self, simulation, target_day=None):
+        """
+        Initialize the SimulationWorker class.
+
+        Args:
+            simulation (Simulation): The simulation to run.
+            target_day (int, optional): Day to run to before waiting for commands. Defaults to the simulation's
+                `days` horizon.
+        """
+        self.simulation = simulation
+        self.target_day = simulation.days if target_day is None else target_day
+        self.condition = threading.Condition()
+        self.queue = queue.Queue()
+        self.metrics_printed = False
+        # Daemon thread: closing the display ends the program without waiting for the remaining days
+        self.thread = threading.Thread(target=self._run, name="simulation-worker", daemon=True)
+
+    def start(self):
+        """Start running the simulation."""
+        self.thread.start()
+
+    def play(self):
+        """Keep advancing the simulation until paused, past the `days` horizon if needed."""
+        self._set_target(math.inf)
+
+    def pause(self):
+        """Stop after the day being computed."""
+        with self.condition:
+            # The day in progress (if any) cannot be interrupted, so it still completes
+            self.target_day = min(self.target_day, self._last_day() + 1)
+            self.condition.notify()
+
+    def step(self):
+        """Advance by a single day, then pause. While running, this pauses after the day in progress."""
+        with self.condition:
+            self.target_day = self._last_day() + 1
+            self.condition.notify()
+
+    def run_to_day(self, day):
+        """
+        Advance until the given day, then pause. If the worker is paused past that day already, it stays paused
+        and reports ("paused", day) again, so that the request is still answered.
+
+        Args:
+            day (int): The day to reach.
+        """
+        with self.condition:
+            already_paused = self._last_day() >= self.target_day
+            self.target_day = day
+            if already_paused and self._last_day() >= day:
+                self.queue.put(("paused", self._last_day()))
+            self.condition.notify()
+
+    def _set_target(self, day):
+        """
+        Change the day to run to and wake the worker up.
+
+        Args:
+            day (int or float): The new target day (math.inf to run until paused).
+        """
+        with self.condition:
+            self.target_day = day
+            self.condition.notify()
+
+    def _last_day(self):
+        """
+        Get the last stored day of the simulation.
+
+        Returns:
+            int: The last day, or -1 before day 0 exists.
+        """
+        return len(self.simulation.states) - 1
+
+    def _run(self):
+        """Advance the simulation whenever its target day is ahead, reporting each day and each pause on the queue."""
+        try:
+            while True:
+                with self.condition:
+                    if self._last_day() >= self.target_day:
+                        self._report_pause()
+                        while self._last_day() >= self.target_day:
+                            self.condition.wait()
+                day = self.simulation.step()
+                self.queue.put(("day", day))
+        except Exception as error:
+            logging.error(f"Simulation failed: {error}")
+            self.queue.put(("error", error))
+
+    def _report_pause(self):
+        """Announce that the target day was reached, printing the metrics the first time the horizon is reached."""
+        day = self._last_day()
+        if not self.metrics_printed and day >= self.simulation.days:
+            self.simulation.print_simulation_metrics()
+            self.metrics_printed = True
+        logging.info(f"Simulation paused on day {day}.")
+        self.queue.put(("paused", day))
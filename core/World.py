@@ -1,5 +1,12 @@
+import logging
+import time
+from itertools import chain
 import numpy as np
 from .Particle import Particle
+from .Neighborhood import Neighborhood
+from .fields import dilate_mask, any_neighbor, compute_changed_mask, reduce_chunks, expand_chunks, \
+    compute_precipitation, compute_wind_field, count_neighbor_types, NEIGHBOR_OFFSETS, \
+    hash_fields, count_transitions
 from config.Config import config_instance
 
 
@@ -8,7 +15,7 @@ class World:
     Represents the simulation world, including the grid of particles and associated behaviors.
     """
 
-    def __init__(self, grid_size=None, initial_ratios=None, day_number=0):
+    def __init__(self, grid_size=None, initial_ratios=None, day_number=0, config=None):
         """
         Initialize the World class.
 
@@ -16,8 +23,10 @@ class World:
             grid_size (tuple): Dimensions of the grid (x, y, z). Defaults to config's Grid Dimensions.
             initial_ratios (dict): Initial ratios for cell types. Defaults to config's initial ratios.
             day_number (int): The current day in the simulation.
+            config (dict, optional): Configuration for this world and its particles. Defaults to the global configuration.
         """
-        self.config = config_instance.get()  # Access the centralized configuration
+        # Access the centralized configuration unless a world-specific one is given (e.g. a forked branch)
+        self.config = config if config is not None else config_instance.get()
         self.grid_size = grid_size or self.config["grid_size"]
         self.grid = np.empty(self.grid_size, dtype=object)
 
@@ -27,11 +36,27 @@ class World:
         self.initial_deserts_ratio = initial_ratios["desert"]
         self.initial_vacuum_ratio = initial_ratios["vacuum"]
         self.day_number = day_number
-
-    def clone(self):
+        # Voxels that changed during the step that produced this state (None when unknown)
+        self.changed_mask = None
+        # Number of cells kept as is by activity tracking during the step that produced this state
+        self.skipped_cells = 0
+        # Number of kept cells that "activity_validation" found diverging from their recomputed state
+        self.activity_mismatches = 0
+        # Chunks whose cells were all kept as is during the step that produced this state (None when unknown)
+        self.asleep_chunks = None
+        # Seconds spent in each phase of the step that produced this state (None unless "profile_phases" is on)
+        self.phase_timings = None
+        # Cell type transitions of the rules run during the step that produced this state, as a (from, to)
+        # matrix (None unless "rule_statistics" is on)
+        self.transition_counts = None
+
+    def clone(self, config=None):
         """
         Create a deep copy of the current World state.
 
+        Args:
+            config (dict, optional): Configuration for the cloned world. Defaults to the current world's configuration.
+
         Returns:
             World: A cloned instance of the current World.
         """
@@ -43,23 +68,34 @@ class World:
                 "desert": self.initial_deserts_ratio,
                 "vacuum": self.initial_vacuum_ratio
             },
-            day_number=self.day_number
+            day_number=self.day_number,
+            config=config if config is not None else self.config
         )
+        # Activity tracking is only valid while the rules (i.e. the configuration) stay the same
+        if cloned_state.config == self.config:
+            cloned_state.changed_mask = self.changed_mask
 
+        sparse_vacuum = cloned_state.config.get("sparse_vacuum", False)
         for i in range(self.grid_size[0]):
             for j in range(self.grid_size[1]):
                 for k in range(self.grid_size[2]):
                     if self.grid[i, j, k] is None:
-                        self.grid[i, j, k] = Particle(
+                        if sparse_vacuum:
+                            continue  # Implicit vacuum stays implicit
+                        # Only the clone is made dense: the source may be a state shared with other branches
+                        cloned_state.grid[i, j, k] = Particle(
                             cell_type=8,  # Default to Vacuum
                             temperature=0,
                             water_mass=0,
                             pollution_level=0,
                             direction=(0, 0, 0),
                             position=(i, j, k),
-                            grid_size=self.grid_size
+                            grid_size=self.grid_size,
+                            config=cloned_state.config
                         )
-                    cloned_state.grid[i, j, k] = self.grid[i, j, k].clone()
+                        continue
+                    cloned_state.grid[i, j, k] = self.grid[i, j, k].clone(
+                        config=cloned_state.config)
 
         return cloned_state
 
@@ -162,12 +198,14 @@ class World:
         baseline_temperature = self.config["baseline_temperature"]
         baseline_pollution_level = self.config["baseline_pollution_level"]
 
+        sparse_vacuum = self.config.get("sparse_vacuum", False)
+
         for i in range(x):
             for j in range(y):
                 for k in range(z):
 
-                    if self.grid[i, j, k] is None:
-                        # Default to vacuum
+                    if self.grid[i, j, k] is None and not sparse_vacuum:
+                        # Default to vacuum (implicit when vacuum is stored sparsely)
                         self.grid[i, j, k] = Particle(
                             cell_type=8,  # Vacuum
                             temperature=0,
@@ -175,7 +213,8 @@ class World:
                             pollution_level=0,
                             direction=(0, 0, 0),
                             position=(i, j, k),
-                            grid_size=self.grid_size
+                            grid_size=self.grid_size,
+                            config=self.config
                         )
 
                     cell_type = 8  # Default to Vacuum
@@ -273,9 +312,11 @@ class World:
                             pollution_level=pollution,
                             direction=direction,
                             position=(i, j, k),
-                            grid_size=self.grid_size
+                            grid_size=self.grid_size,
+                            config=self.config
                         )
 
+        self._quantize_fields()
         self._recalculate_global_attributes()  # Update global stats
 
     def update_cells_on_grid(self):
@@ -351,6 +392,25 @@ class World:
 
             return neighbors
 
+        def get_neighbor_slots(i, j, k):
+            """
+            Get the neighboring cells of the cell at (i, j, k) in fixed slots: -x, +x, -y, +y, -z, +z.
+
+            Args:
+                i (int): The x-coordinate of the cell.
+                j (int): The y-coordinate of the cell.
+                k (int): The z-coordinate of the cell.
+
+            Returns:
+                tuple: The neighboring particle in each slot, or None outside the grid and for implicit vacuum.
+            """
+            return tuple(
+                self.grid[i + dx, j + dy, k + dz]
+                if 0 <= i + dx < self.grid_size[0] and 0 <= j + dy < self.grid_size[1] and 0 <= k + dz < self.grid_size[2]
+                else None
+                for dx, dy, dz in NEIGHBOR_OFFSETS
+            )
+
         def accumulate_water_transfers():
             """
             Compute all water transfers for the grid.
@@ -361,24 +421,23 @@ class World:
             transfer_map = {}
             scale_factor = 1e3  # Scale down large transfer amounts if necessary
 
-            for i in range(self.grid_size[0]):
-                for j in range(self.grid_size[1]):
-                    for k in range(self.grid_size[2]):
-                        cell = self.grid[i, j, k]
-                        if cell and cell.cell_type != 8:  # Exclude Vacuum
-                            neighbors = [
-                                self.grid[nx, ny, nz]
-                                for nx, ny, nz in get_neighbor_positions(i, j, k)
-                            ]
-                            cell_transfers = cell.calculate_water_transfer(
-                                neighbors)
-                            for neighbor_pos, transfer_amount in cell_transfers.items():
-                                # Scale transfer amounts if they exceed the scale factor
-                                scaled_transfer = transfer_amount / \
-                                    scale_factor if abs(
-                                        transfer_amount) > scale_factor else transfer_amount
-                                transfer_map[neighbor_pos] = transfer_map.get(
-                                    neighbor_pos, 0) + scaled_transfer
+            for i, j, k in transfer_positions:
+                cell = self.grid[i, j, k]
+                if cell and cell.cell_type != 8:  # Exclude Vacuum
+                    neighbors = [
+                        self.grid[nx, ny, nz]
+                        for nx, ny, nz in get_neighbor_positions(i, j, k)
+                        if self.grid[nx, ny, nz] is not None  # Implicit vacuum never exchanges water
+                    ]
+                    cell_transfers = cell.calculate_water_transfer(
+                        neighbors)
+                    for neighbor_pos, transfer_amount in cell_transfers.items():
+                        # Scale transfer amounts if they exceed the scale factor
+                        scaled_transfer = transfer_amount / \
+                            scale_factor if abs(
+                                transfer_amount) > scale_factor else transfer_amount
+                        transfer_map[neighbor_pos] = transfer_map.get(
+                            neighbor_pos, 0) + scaled_transfer
 
             return transfer_map
 
@@ -401,36 +460,171 @@ class World:
 
         x, y, z = self.grid_size
 
+        # Phase profiling: time spent between phase boundaries, accumulated per phase name
+        profile_phases = self.config.get("profile_phases", False)
+        self.phase_timings = {} if profile_phases else None
+        phase_start = time.perf_counter() if profile_phases else None
+
+        def end_phase(name):
+            """
+            Record the time elapsed since the previous phase boundary under the given phase name.
+
+            Args:
+                name (str): Name of the phase that just ended.
+            """
+            nonlocal phase_start
+            now = time.perf_counter()
+            self.phase_timings[name] = self.phase_timings.get(name, 0.0) + (now - phase_start)
+            phase_start = now
+
+        # Activity tracking: skip static cells whose neighborhood did not change during the last step
+        activity_tracking = self.config.get("activity_tracking", False)
+        activity_tolerance = self.config.get("activity_tolerance", 0.0)
+        activity_validation = self.config.get("activity_validation", False)
+        previous_fields = None
+        skip_mask = None
+        if activity_tracking:
+            previous_fields = self.get_field_arrays()
+            skip_mask = self._compute_skip_mask(previous_fields["cell_type"])
+            if skip_mask is not None:
+                self.skipped_cells = int(skip_mask.sum())
+        validation_updates = {}
+
+        # Kept cells bypass Phases 3 and 4 (unless they are validated), and Phase 1 only runs where its transfers
+        # can reach a recomputed cell: the water of a recomputed cell's neighbors depends on their own neighbors
+        bypass_mask = skip_mask if skip_mask is not None and not activity_validation else None
+        if bypass_mask is None:
+            transfer_positions, update_positions = np.ndindex(x, y, z), np.ndindex(x, y, z)
+        else:
+            transfer_mask = ~bypass_mask
+            for _ in range(2):
+                transfer_mask = transfer_mask | any_neighbor(transfer_mask)
+            transfer_positions = map(tuple, np.argwhere(transfer_mask).tolist())
+            update_positions = map(tuple, np.argwhere(~bypass_mask).tolist())
+
+        # Sparse vacuum: implicit vacuum cells without fluid neighbors are converted in bulk
+        sparse_vacuum = self.config.get("sparse_vacuum", False)
+        quiet_vacuum_mask = self._compute_quiet_vacuum_mask() if sparse_vacuum else None
+        if profile_phases:
+            end_phase("setup")
+
         # Phase 1: Compute water transfers
         transfer_map = accumulate_water_transfers()
+        if profile_phases:
+            end_phase("water_transfer")
 
         # Phase 2: Apply transfers
         apply_water_transfers(transfer_map)
         updates = {}
+        if profile_phases:
+            end_phase("apply_transfers")
+
+        # Precipitation is either resolved for the whole grid at once, or per rain cell during Phase 3
+        vectorized_precipitation = self.config.get("vectorized_precipitation", False)
+        falling_rain = self._apply_precipitation() if vectorized_precipitation else None
+
+        # Vectorized wind: vacuum cells take their wind from a direction field computed for the whole grid.
+        # Vacuum next to a rain cell changed by inline precipitation (or to the cell it fed) computes it per cell.
+        wind_field = None
+        if self.config.get("vectorized_wind", False):
+            wind_field = self._compute_vacuum_wind_field(falling_rain)
+
+        # Neighbor histograms: rule predicates look up neighbor type counts instead of scanning neighbor lists.
+        # Neighbor slots: rule code gets the neighbors below, aligned and above from fixed slots instead of filtering.
+        # Cells next to a rain cell changed by inline precipitation fall back to plain neighbor lists, and
+        # cells next to rain moved down by precipitation cannot rely on the slots to tell elevations apart.
+        histograms = None
+        if self.config.get("neighbor_histograms", False):
+            histograms = self._compute_neighbor_histograms(falling_rain)
+        neighbor_slots = self.config.get("neighbor_slots", False)
+        shifted_mask = None
+        if neighbor_slots and falling_rain is not None:
+            shifted_mask = falling_rain | any_neighbor(falling_rain)
+        stale_neighborhoods = set()
+        # Rule statistics: cell types as the rules see them, to pair with the types they produce (updated below for
+        # rain that inline precipitation turns into air before its rule runs)
+        rule_statistics = self.config.get("rule_statistics", False)
+        rule_types = self.get_field_arrays(("cell_type",))["cell_type"] if rule_statistics else None
+        if profile_phases:
+            end_phase("field_passes")
 
         # Phase 3: Compute next states for all cells
-        for i in range(x):
-            for j in range(y):
-                for k in range(z):
-                    cell = self.grid[i, j, k]
-                    if cell.cell_type == 7:  # Rain
-                            below = self.grid[i, j, k -
-                                              1] if k - 1 >= 0 else None
-                            # Ground types
-                            if below and below.cell_type in {1, 4, 5}:
-                                below.water_mass += cell.water_mass  # Absorb rain
-                                cell.cell_type = 6  # Turn into air
-                            elif below and below.cell_type == 6:  # Air
-                                below.water_mass += cell.water_mass
-                                cell.water_mass = 0
-                            else:  # Rain continues falling
-                                cell.position = (i, j, k - 1)
+        for i, j, k in update_positions:
+            cell = self.grid[i, j, k]
+            if wind_field is not None and (cell is None or cell.cell_type == 8) and \
+                    (i, j, k) not in stale_neighborhoods:
+                wind = tuple(wind_field[i, j, k].tolist())
+                if cell is None:
+                    updates[(i, j, k)] = self._update_implicit_vacuum((i, j, k), wind=wind)
+                else:
+                    # Vacuum only depends on its neighbors through the wind, which is already known
+                    updates[(i, j, k)] = cell.compute_next_state([])
+                    updates[(i, j, k)].direction = wind
+                continue
+            if cell is None:
+                neighbors = None
+                if not quiet_vacuum_mask[i, j, k]:
                     neighbors = [
-                            self.grid[nx, ny, nz]
-                            for nx, ny, nz in get_neighbor_positions(i, j, k)
-                            if self.grid[nx, ny, nz] is not None
+                        self.grid[nx, ny, nz]
+                        for nx, ny, nz in get_neighbor_positions(i, j, k)
+                        if self.grid[nx, ny, nz] is not None
                     ]
-                    updates[(i, j, k)] = cell.compute_next_state(neighbors)
+                updates[(i, j, k)] = self._update_implicit_vacuum((i, j, k), neighbors)
+                continue
+            if skip_mask is not None and skip_mask[i, j, k]:
+                # An unchanged neighborhood yields an unchanged cell: keep it as is, and recompute it for validation
+                updates[(i, j, k)] = cell
+                neighbors = [
+                    self.grid[nx, ny, nz]
+                    for nx, ny, nz in get_neighbor_positions(i, j, k)
+                    if self.grid[nx, ny, nz] is not None
+                ]
+                validation_updates[(i, j, k)] = cell.compute_next_state(neighbors)
+                continue
+            if cell.cell_type == 7 and not vectorized_precipitation:  # Rain
+                    below = self.grid[i, j, k -
+                                      1] if k - 1 >= 0 else None
+                    # Ground types
+                    if below and below.cell_type in {1, 4, 5}:
+                        below.water_mass += cell.water_mass  # Absorb rain
+                        cell.cell_type = 6  # Turn into air
+                    elif below and below.cell_type == 6:  # Air
+                        below.water_mass += cell.water_mass
+                        cell.water_mass = 0
+                    else:  # Rain continues falling
+                        cell.position = (i, j, k - 1)
+                    if histograms is not None or neighbor_slots or wind_field is not None:
+                        stale_neighborhoods.update(get_neighbor_positions(i, j, k))
+                        stale_neighborhoods.add((i, j, k))
+                    if wind_field is not None and below and below.cell_type in {1, 4, 5, 6}:
+                        # The wind weighs neighbors by their water mass, which the cell below just received
+                        stale_neighborhoods.update(get_neighbor_positions(i, j, k - 1))
+            if neighbor_slots and (i, j, k) not in stale_neighborhoods and \
+                    (shifted_mask is None or not shifted_mask[i, j, k]):
+                counts = histograms[i, j, k].tolist() if histograms is not None else None
+                neighbors = Neighborhood.from_slots(get_neighbor_slots(i, j, k), counts)
+            else:
+                neighbors = [
+                        self.grid[nx, ny, nz]
+                        for nx, ny, nz in get_neighbor_positions(i, j, k)
+                        if self.grid[nx, ny, nz] is not None
+                ]
+                if histograms is not None and (i, j, k) not in stale_neighborhoods:
+                    neighbors = Neighborhood(neighbors, histograms[i, j, k].tolist())
+            if rule_types is not None:
+                rule_types[i, j, k] = cell.cell_type
+            updates[(i, j, k)] = cell.compute_next_state(neighbors)
+
+        if skip_mask is not None:
+            # Undo the in-place water updates of Phases 2 and 3 on the cells that were kept as is
+            for i, j, k in zip(*np.nonzero(skip_mask)):
+                self.grid[i, j, k].water_mass = float(previous_fields["water_mass"][i, j, k])
+            if activity_validation:
+                self._validate_skipped_cells(updates, validation_updates, activity_tolerance)
+        if rule_statistics:
+            self.transition_counts = self._count_rule_transitions(updates, rule_types, skip_mask)
+        if profile_phases:
+            end_phase("next_state")
 
         # Phase 4: Resolve collisions
         position_map = {}
@@ -446,81 +640,316 @@ class World:
                 position_map[next_position] = resolve_collision(
                     position_map[next_position], updated_cell
                 )
+        if profile_phases:
+            end_phase("collisions")
 
         # Phase 5: Populate the new grid
         new_grid = np.empty_like(self.grid)
         for (i, j, k), cell in position_map.items():
             cell.position = (i, j, k)
             new_grid[i, j, k] = cell
-
-        # Fill remaining cells with vacuum
-        for i in range(x):
-            for j in range(y):
-                for k in range(z):
-                    if new_grid[i, j, k] is None:
-                        new_grid[i, j, k] = Particle(
-                            cell_type=8,  # Vacuum
-                            temperature=0,
-                            water_mass=0,
-                            pollution_level=0,
-                            direction=(0, 0, 0),
-                            position=(i, j, k),
-                            grid_size=self.grid_size
-                        )
+        if bypass_mask is not None:
+            # Kept cells stay in place; they win any collision since they would have come out unchanged
+            new_grid[bypass_mask] = self.grid[bypass_mask]
+        if profile_phases:
+            end_phase("populate_grid")
+
+        # Fill remaining cells with vacuum (left implicit when vacuum is stored sparsely)
+        if not sparse_vacuum:
+            for i in range(x):
+                for j in range(y):
+                    for k in range(z):
+                        if new_grid[i, j, k] is None:
+                            new_grid[i, j, k] = Particle(
+                                cell_type=8,  # Vacuum
+                                temperature=0,
+                                water_mass=0,
+                                pollution_level=0,
+                                direction=(0, 0, 0),
+                                position=(i, j, k),
+                                grid_size=self.grid_size,
+                                config=self.config
+                            )
+
+        if profile_phases:
+            end_phase("vacuum_refill")
 
         self.grid = new_grid
+        self._quantize_fields()
+        if activity_tracking:
+            self.changed_mask = compute_changed_mask(
+                previous_fields, self.get_field_arrays(), activity_tolerance)
+        if profile_phases:
+            end_phase("finalize")
         self._recalculate_global_attributes()
+        if profile_phases:
+            end_phase("global_attributes")
 
-    def _recalculate_global_attributes(self):
+    def _compute_skip_mask(self, cell_types):
         """
-        Recalculate global attributes like average temperature, pollution, water mass,
-        and counts of cities and forests. Also calculates averages and standard deviations
-        for temperature, pollution, water mass, city count, and forest count.
+        Determine which cells can keep their current state without recomputing it.
+
+        A static cell (ocean, desert, ice, forest or city) is skipped when nothing changed within three
+        cells of it during the last step: its next state only depends on that neighborhood (water transfers,
+        neighbor states and particles that may move into it), so it would come out unchanged again.
+
+        With the "chunk_size" option, the grid is split into cubic chunks that are put to sleep as a whole:
+        a chunk is asleep when all its cells are static and no cell changed in it or close enough to it in a
+        neighboring chunk. Any change nearby (e.g. a mobile particle entering) wakes it up again.
+
+        Args:
+            cell_types (np.ndarray): Cell types of the current grid.
+
+        Returns:
+            np.ndarray or None: Boolean mask of cells to skip, or None if no step has been tracked yet.
+        """
+        if self.changed_mask is None:
+            return None
+        static = np.isin(cell_types, (0, 1, 3, 4, 5))
+        chunk_size = self.config.get("chunk_size")
+        if chunk_size:
+            changed_chunks = reduce_chunks(self.changed_mask, chunk_size, np.any)
+            active_chunks = dilate_mask(changed_chunks, radius=-(-3 // chunk_size))
+            self.asleep_chunks = reduce_chunks(static, chunk_size, np.all) & ~active_chunks
+            return expand_chunks(self.asleep_chunks, chunk_size, cell_types.shape)
+        active = dilate_mask(self.changed_mask, radius=3)
+        return static & ~active
+
+    def _apply_precipitation(self):
+        """
+        Resolve precipitation for all rain cells in one pass (see fields.compute_precipitation).
+        Ground directly below a rain cell absorbs its water and the rain turns into air, air directly below
+        a rain cell takes its water, and rain above anything else keeps falling by one cell.
+
+        Returns:
+            np.ndarray: Boolean mask of the rain cells that keep falling.
+        """
+        fields = self.get_field_arrays(names=("cell_type", "water_mass"))
+        absorbed, drying, falling, received = compute_precipitation(fields["cell_type"], fields["water_mass"])
+
+        for i, j, k in np.argwhere(absorbed | drying).tolist():
+            self.grid[i, j, k - 1].water_mass = float(fields["water_mass"][i, j, k - 1] + received[i, j, k - 1])
+        for i, j, k in np.argwhere(absorbed).tolist():
+            self.grid[i, j, k].cell_type = 6  # Turn into air
+        for i, j, k in np.argwhere(drying).tolist():
+            self.grid[i, j, k].water_mass = 0
+        for i, j, k in np.argwhere(falling).tolist():
+            self.grid[i, j, k].position = (i, j, k - 1)
+        return falling
+
+    def _compute_vacuum_wind_field(self, falling_rain=None):
         """
-        total_temperature = 0
-        total_pollution = 0
-        total_water_mass = 0
-        total_cells = 0
+        Compute the wind that vacuum cells pick up when they turn into air (see fields.compute_wind_field).
+        Vacuum evaluates the wind after warming up by 2 degrees, and falling rain is already one cell lower.
 
-        temperature_values = []
-        pollution_values = []
-        water_mass_values = []
-        city_counts = []
-        forest_counts = []
+        Args:
+            falling_rain (np.ndarray, optional): Boolean mask of rain cells that were moved down by precipitation.
 
-        total_cities = 0
-        total_forests = 0
+        Returns:
+            np.ndarray: Wind directions (int8) with a trailing axis of size 3.
+        """
+        fields = self.get_field_arrays(names=("cell_type", "temperature", "water_mass", "direction"))
+        altitude = np.broadcast_to(np.arange(self.grid_size[2], dtype=np.float64), self.grid_size)
+        if falling_rain is not None:
+            altitude = altitude - falling_rain
+        return compute_wind_field(
+            fields["cell_type"], fields["temperature"], fields["water_mass"], fields["direction"],
+            own_temperature=fields["temperature"] + 2, altitude=altitude)
+
+    def _compute_neighbor_histograms(self, falling_rain=None):
+        """
+        Count the neighbors of each cell type around every cell, split into below, aligned and above
+        groups (see fields.count_neighbor_types). Implicit vacuum cells are not counted as neighbors.
 
-        # Iterate over the grid
-        for i in range(self.grid_size[0]):
-            for j in range(self.grid_size[1]):
-                for k in range(self.grid_size[2]):
-                    cell = self.grid[i, j, k]
-                    if cell is None:
-                        continue
-                    total_cells += 1
-                    total_temperature += cell.temperature
-                    total_pollution += cell.pollution_level
-                    total_water_mass += cell.water_mass
+        Args:
+            falling_rain (np.ndarray, optional): Boolean mask of rain cells that were moved down by precipitation.
+
+        Returns:
+            np.ndarray: Counts (uint8) shaped (X, Y, Z, 3, 10).
+        """
+        fields = self.get_field_arrays(names=("cell_type",))
+        altitude = np.broadcast_to(np.arange(self.grid_size[2], dtype=np.float64), self.grid_size)
+        if falling_rain is not None:
+            altitude = altitude - falling_rain
+        return count_neighbor_types(fields["cell_type"], altitude=altitude, present=np.not_equal(self.grid, None))
 
-                    temperature_values.append(cell.temperature)
-                    pollution_values.append(cell.pollution_level)
-                    water_mass_values.append(cell.water_mass)
+    def _compute_quiet_vacuum_mask(self):
+        """
+        Find implicit vacuum cells (empty grid slots) with no cloud, air or rain among their six neighbors.
+        Their wind direction is (0, 0, 0), so their next state does not depend on the neighborhood at all.
+
+        Returns:
+            np.ndarray: Boolean mask of quiet implicit vacuum cells.
+        """
+        fields = self.get_field_arrays(names=("cell_type",))
+        implicit_vacuum = np.equal(self.grid, None)
+        fluid = np.isin(fields["cell_type"], (2, 6, 7))
+        return implicit_vacuum & ~any_neighbor(fluid)
+
+    def _update_implicit_vacuum(self, position, neighbors=None, wind=None):
+        """
+        Compute the next state of an implicit vacuum cell, matching Particle._update_vacuum for a
+        vacuum particle with zero temperature, water mass and pollution: it turns into air that is
+        2 degrees warmer and follows the wind of its fluid neighbors.
+
+        Args:
+            position (tuple): Position of the cell (x, y, z).
+            neighbors (list, optional): Neighboring particles, or None if the cell has no fluid neighbors.
+            wind (tuple, optional): Precomputed wind direction, used instead of the neighbors.
+
+        Returns:
+            Particle: The air particle replacing the vacuum.
+        """
+        air = Particle(
+            cell_type=6,  # Air
+            temperature=2,  # Vacuum temperature (0) warmed by evaporation
+            water_mass=0.0,
+            pollution_level=0,
+            direction=(0, 0, 0),
+            position=position,
+            grid_size=self.grid_size,
+            config=self.config
+        )
+        if wind is not None:
+            air.direction = wind
+        elif neighbors:
+            air.direction = air.calculate_dynamic_wind_direction(neighbors)
+        return air
+
+    def _count_rule_transitions(self, updates, rule_types, skip_mask=None):
+        """
+        Count the cell type transitions produced by the rules of Phase 3.
+
+        Args:
+            updates (dict): Next states computed by the rules, keyed by position.
+            rule_types (np.ndarray): Cell types of the grid when the rules were run.
+            skip_mask (np.ndarray, optional): Cells kept as is by activity tracking; they did not run their rule.
+
+        Returns:
+            np.ndarray: (10, 10) matrix; entry [a, b] is the number of type-a cells whose rule produced type b.
+                Row sums give the number of cells that ran each `_update_*` rule.
+        """
+        positions = np.array(list(updates.keys()), dtype=np.intp).reshape(-1, 3)
+        new_types = np.fromiter((cell.cell_type for cell in updates.values()), dtype=np.int64, count=len(updates))
+        old_types = rule_types[tuple(positions.T)]
+        if skip_mask is not None:
+            ran = ~skip_mask[tuple(positions.T)]
+            old_types, new_types = old_types[ran], new_types[ran]
+        return count_transitions(old_types, new_types)
+
+    def _validate_skipped_cells(self, updates, validation_updates, tolerance):
+        """
+        Compare skipped cells against a full recomputation and log any divergence.
+
+        Args:
+            updates (dict): Next states used for the grid, keyed by position.
+            validation_updates (dict): Fully recomputed next states of the skipped cells, keyed by position.
+            tolerance (float): Largest difference in temperature, water mass or pollution accepted.
+        """
+        mismatches = []
+        for position, expected in validation_updates.items():
+            kept = updates[position]
+            if (
+                kept.cell_type != expected.cell_type
+                or tuple(kept.direction) != tuple(expected.direction)
+                or abs(kept.temperature - expected.temperature) > tolerance
+                or abs(kept.water_mass - expected.water_mass) > tolerance
+                or abs(kept.pollution_level - expected.pollution_level) > tolerance
+            ):
+                mismatches.append(position)
+
+        self.activity_mismatches = len(mismatches)
+        if mismatches:
+            logging.warning(
+                f"Activity tracking: {len(mismatches)} of {len(validation_updates)} skipped cells diverge "
+                f"from full recomputation on day {self.day_number} (first at {mismatches[0]}).")
+
+    def get_field_arrays(self, names=None):
+        """
+        Extract the per-voxel fields of the grid into NumPy arrays.
+        Empty grid slots (implicit vacuum) read as vacuum with zero temperature, water mass and pollution.
+
+        Args:
+            names (iterable, optional): Fields to extract. Defaults to all of them.
+
+        Returns:
+            dict: Arrays shaped like the grid: "cell_type" (int8), "temperature", "water_mass" and
+                "pollution_level" (float64, or the "field_precision" option), plus "direction" (int8)
+                with a trailing axis of size 3.
+        """
+        names = names or ("cell_type", "temperature", "water_mass", "pollution_level", "direction")
+        float_dtype = np.dtype(self.config.get("field_precision", "float64"))
+        occupied = np.not_equal(self.grid, None)
+        cells = self.grid[occupied]
+        count = cells.size
+
+        fields = {}
+        for name in names:
+            if name == "direction":
+                values = np.fromiter(chain.from_iterable(cell.direction for cell in cells), dtype=np.int8, count=3 * count)
+                fields[name] = np.zeros((*self.grid_size, 3), dtype=np.int8)
+                fields[name][occupied] = values.reshape(count, 3)
+            elif name == "cell_type":
+                fields[name] = np.full(self.grid_size, 8, dtype=np.int8)
+                fields[name][occupied] = np.fromiter((cell.cell_type for cell in cells), dtype=np.int8, count=count)
+            else:
+                fields[name] = np.zeros(self.grid_size, dtype=float_dtype)
+                fields[name][occupied] = np.fromiter((getattr(cell, name) for cell in cells), dtype=float_dtype, count=count)
+        return fields
+
+    def compute_state_hash(self, decimals=6):
+        """
+        Hash the per-voxel fields of the grid, rounding floating-point values first so that
+        states equal up to the given precision hash identically.
+
+        Args:
+            decimals (int): Number of decimals kept for temperature, water mass and pollution.
+
+        Returns:
+            str: Hex digest identifying the state.
+        """
+        return hash_fields(self.get_field_arrays(), decimals)
+
+    def _quantize_fields(self):
+        """
+        Round the temperature, water mass and pollution level of every particle to the field precision
+        (the "field_precision" option), so that the simulation evolves exactly as if it stored its fields
+        in that precision. Nothing to do at the default float64 precision.
+        """
+        if np.dtype(self.config.get("field_precision", "float64")) == np.float64:
+            return
+        names = ("temperature", "water_mass", "pollution_level")
+        occupied = np.not_equal(self.grid, None)
+        cells = self.grid[occupied]
+        fields = self.get_field_arrays(names=names)
+        for name in names:
+            for cell, value in zip(cells, fields[name][occupied].tolist()):
+                setattr(cell, name, value)
+
+    def _recalculate_global_attributes(self):
+        """
+        Recalculate global attributes like average temperature, pollution, water mass,
+        and counts of cities and forests. Also calculates averages and standard deviations
+        for temperature, pollution, water mass, city count, and forest count.
+
+        The reductions always accumulate in float64, whatever the precision of the fields.
+        """
+        # Implicit vacuum cells (sparse storage) read as cells with zero temperature, pollution and water
+        fields = self.get_field_arrays(names=("cell_type", "temperature", "pollution_level", "water_mass"))
+        total_cells = fields["cell_type"].size
 
-                    # Count cities and forests
-                    if cell.cell_type == 5:  # City
-                        total_cities += 1
-                    elif cell.cell_type == 4:  # Forest
-                        total_forests += 1
+        total_temperature = np.sum(fields["temperature"], dtype=np.float64)
+        total_pollution = np.sum(fields["pollution_level"], dtype=np.float64)
+        total_water_mass = np.sum(fields["water_mass"], dtype=np.float64)
 
-        # Add city and forest counts for standard deviation calculations
-        city_counts.append(total_cities)
-        forest_counts.append(total_forests)
+        # Count cities and forests
+        total_cities = int(np.count_nonzero(fields["cell_type"] == 5))  # City
+        total_forests = int(np.count_nonzero(fields["cell_type"] == 4))  # Forest
 
         # Global averages
-        self.avg_temperature = total_temperature / total_cells if total_cells > 0 else 0
-        self.avg_pollution = total_pollution / total_cells if total_cells > 0 else 0
-        self.avg_water_mass = total_water_mass / total_cells if total_cells > 0 else 0
+        self.avg_temperature = float(total_temperature / total_cells) if total_cells > 0 else 0
+        self.avg_pollution = float(total_pollution / total_cells) if total_cells > 0 else 0
+        self.avg_water_mass = float(total_water_mass / total_cells) if total_cells > 0 else 0
 
         # Total counts
         self.total_cities = total_cities
@@ -528,13 +957,9 @@ class World:
         self.total_cells = total_cells
 
         # Standard deviations
-        self.std_dev_temperature = np.std(
-            temperature_values) if temperature_values else 0
-        self.std_dev_pollution = np.std(
-            pollution_values) if pollution_values else 0
-        self.std_dev_water_mass = np.std(
-            water_mass_values) if water_mass_values else 0
-        self.std_dev_city_population = np.std(
-            city_counts) if city_counts else 0
-        self.std_dev_forest_count = np.std(
-            forest_counts) if forest_counts else 0
+        self.std_dev_temperature = np.std(fields["temperature"], dtype=np.float64) if total_cells > 0 else 0
+        self.std_dev_pollution = np.std(fields["pollution_level"], dtype=np.float64) if total_cells > 0 else 0
+        self.std_dev_water_mass = np.std(fields["water_mass"], dtype=np.float64) if total_cells > 0 else 0
+        # A single world holds a single city and forest count
+        self.std_dev_city_population = np.std([total_cities])
+        self.std_dev_forest_count = np.std([total_forests])
@@ -0,0 +1,195 @@
+import numpy as np
+from .Particle import Particle
+from .World import World
+from .fields import pack_cells, unpack_cells, hash_fields
+from config.Config import config_instance
+
+
+class WorldSnapshot:
+    """
+    Compact, read-only record of a World state.
+
+    Cell types and directions are bit-packed into one uint16 per voxel (see fields.pack_cells), and temperature,
+    water mass and pollution are kept as arrays in the world's field precision. The global attributes of the
+    world are kept as well, so a snapshot can stand in for the World in Simulation.states and be turned back
+    into one (with particles) when needed.
+    """
+    GLOBAL_ATTRIBUTES = (
+        "avg_temperature", "avg_pollution", "avg_water_mass",
+        "total_cities", "total_forests", "total_cells",
+        "std_dev_temperature", "std_dev_pollution", "std_dev_water_mass",
+        "std_dev_city_population", "std_dev_forest_count",
+    )
+    FLOAT_FIELDS = ("temperature", "water_mass", "pollution_level")
+
+    def __init__(self, world):
+        """
+        Initialize the WorldSnapshot class.
+
+        Args:
+            world (World): The state to record.
+        """
+        self.config = world.config
+        self.grid_size = tuple(world.grid_size)
+        self.day_number = world.day_number
+        self.initial_ratios = {
+            "city": world.initial_cities_ratio,
+            "forest": world.initial_forests_ratio,
+            "desert": world.initial_deserts_ratio,
+            "vacuum": world.initial_vacuum_ratio
+        }
+
+        fields = world.get_field_arrays()
+        self.cells = pack_cells(fields["cell_type"], fields["direction"])
+        self.fields = {name: fields[name] for name in self.FLOAT_FIELDS}
+
+        for name in self.GLOBAL_ATTRIBUTES:
+            setattr(self, name, getattr(world, name))
+        self.transition_counts = world.transition_counts
+
+    @property
+    def nbytes(self):
+        """
+        int: Number of bytes taken by the per-voxel arrays.
+        """
+        return self.cells.nbytes + sum(values.nbytes for values in self.fields.values())
+
+    @property
+    def grid(self):
+        """
+        np.ndarray: The grid of particles, rebuilt on every access (use get_field_arrays when possible).
+        """
+        return self.to_world().grid
+
+    def get_field_arrays(self, names=None):
+        """
+        Unpack the per-voxel fields, like World.get_field_arrays.
+
+        Args:
+            names (iterable, optional): Fields to extract. Defaults to all of them.
+
+        Returns:
+            dict: Arrays shaped like the grid (see World.get_field_arrays).
+        """
+        names = names or ("cell_type", "temperature", "water_mass", "pollution_level", "direction")
+        fields = {}
+        if "cell_type" in names or "direction" in names:
+            cell_type, direction = unpack_cells(self.cells)
+            fields.update(cell_type=cell_type, direction=direction)
+        for name in names:
+            if name in self.FLOAT_FIELDS:
+                fields[name] = self.fields[name].copy()
+        return {name: fields[name] for name in names}
+
+    def compute_state_hash(self, decimals=6):
+        """
+        Hash the per-voxel fields, identically to World.compute_state_hash for the recorded world.
+
+        Args:
+            decimals (int): Number of decimals kept for temperature, water mass and pollution.
+
+        Returns:
+            str: Hex digest identifying the state.
+        """
+        return hash_fields(self.get_field_arrays(), decimals)
+
+    def to_world(self, config=None):
+        """
+        Rebuild the recorded state as a World with particles.
+        Plain vacuum cells are left implicit when the configuration stores vacuum sparsely.
+
+        Args:
+            config (dict, optional): Configuration for the rebuilt world. Defaults to the recorded one.
+
+        Returns:
+            World: The rebuilt world.
+        """
+        world = World(
+            grid_size=self.grid_size,
+            initial_ratios=dict(self.initial_ratios),
+            day_number=self.day_number,
+            config=config if config is not None else self.config
+        )
+        sparse_vacuum = world.config.get("sparse_vacuum", False)
+
+        fields = self.get_field_arrays()
+        cell_types = fields["cell_type"].tolist()
+        directions = fields["direction"].tolist()
+        values = {name: fields[name].tolist() for name in self.FLOAT_FIELDS}
+        for i, j, k in np.ndindex(*self.grid_size):
+            cell_type = cell_types[i][j][k]
+            temperature = values["temperature"][i][j][k]
+            water_mass = values["water_mass"][i][j][k]
+            pollution_level = values["pollution_level"][i][j][k]
+            direction = tuple(directions[i][j][k])
+            if sparse_vacuum and cell_type == 8 and not (temperature or water_mass or pollution_level or any(direction)):
+                continue  # Implicit vacuum
+            world.grid[i, j, k] = Particle(
+                cell_type=cell_type,
+                temperature=temperature,
+                water_mass=water_mass,
+                pollution_level=pollution_level,
+                direction=direction,
+                position=(i, j, k),
+                grid_size=world.grid_size,
+                config=world.config
+            )
+
+        for name in self.GLOBAL_ATTRIBUTES:
+            setattr(world, name, getattr(self, name))
+        world.transition_counts = self.transition_counts
+        return world
+
+    def clone(self, config=None):
+        """
+        Create a World from the snapshot, so a simulation can resume from a compacted state like from a World.
+
+        Args:
+            config (dict, optional): Configuration for the new world. Defaults to the recorded one.
+
+        Returns:
+            World: The rebuilt world.
+        """
+        return self.to_world(config)
+
+    def save(self, path):
+        """
+        Archive the snapshot to a compressed .npz file. The configuration is not saved.
+
+        Args:
+            path (str): Destination file path.
+        """
+        np.savez_compressed(
+            path,
+            cells=self.cells,
+            grid_size=np.array(self.grid_size),
+            day_number=np.array(self.day_number),
+            initial_ratios=np.array([self.initial_ratios[key] for key in ("city", "forest", "desert", "vacuum")]),
+            global_attributes=np.array([getattr(self, name) for name in self.GLOBAL_ATTRIBUTES], dtype=np.float64),
+            **self.fields
+        )
+
+    @classmethod
+    def load(cls, path, config=None):
+        """
+        Load a snapshot archived by save().
+
+        Args:
+            path (str): Source file path.
+            config (dict, optional): Configuration of the recorded world. Defaults to the global configuration.
+
+        Returns:
+            WorldSnapshot: The loaded snapshot.
+        """
+        with np.load(path) as archive:
+            snapshot = cls.__new__(cls)
+            snapshot.config = config if config is not None else config_instance.get()
+            snapshot.grid_size = tuple(int(size) for size in archive["grid_size"])
+            snapshot.day_number = int(archive["day_number"])
+            snapshot.initial_ratios = dict(zip(("city", "forest", "desert", "vacuum"), archive["initial_ratios"].tolist()))
+            snapshot.transition_counts = None
+            snapshot.cells = archive["cells"]
+            snapshot.fields = {name: archive[name] for name in cls.FLOAT_FIELDS}
+            for name, value in zip(cls.GLOBAL_ATTRIBUTES, archive["global_attributes"].tolist()):
+                setattr(snapshot, name, int(value) if name.startswith("total_") else value)
+        return snapshot
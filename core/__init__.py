@@ -1,3 +1,4 @@
 from .Particle import Particle
 from .World import World
+from .WorldSnapshot import WorldSnapshot
 from .Simulation import Simulation
@@ -0,0 +1,360 @@
+import hashlib
+import numpy as np
+
+
+# Offsets of the six face neighbors, in the order World.update_cells_on_grid lists them
+NEIGHBOR_OFFSETS = (
+    (-1, 0, 0), (1, 0, 0),  # Left and right
+    (0, -1, 0), (0, 1, 0),  # Up and down
+    (0, 0, -1), (0, 0, 1)   # Below and above
+)
+
+
+####################################################################################################################
+###################################### MASK OPERATIONS #############################################################
+####################################################################################################################
+
+def dilate_mask(mask, radius=1, wrap_axes=(0, 1)):
+    """
+    Grow a boolean voxel mask by `radius` cells in every direction (a cube-shaped neighborhood).
+
+    The x and y axes wrap around like particle movement on the toroidal grid, while the z axis is clamped.
+
+    Args:
+        mask (np.ndarray): Boolean mask shaped like the grid.
+        radius (int): Number of cells to grow the mask by along each axis.
+        wrap_axes (tuple): Axes on which the grid wraps around.
+
+    Returns:
+        np.ndarray: The dilated mask.
+    """
+    result = mask.copy()
+    for axis in range(mask.ndim):
+        base = result.copy()
+        for shift in range(1, min(radius, mask.shape[axis] - 1) + 1):
+            if axis in wrap_axes:
+                result |= np.roll(base, shift, axis=axis)
+                result |= np.roll(base, -shift, axis=axis)
+            else:
+                lower = [slice(None)] * mask.ndim
+                upper = [slice(None)] * mask.ndim
+                lower[axis] = slice(None, -shift)
+                upper[axis] = slice(shift, None)
+                result[tuple(upper)] |= base[tuple(lower)]
+                result[tuple(lower)] |= base[tuple(upper)]
+    return result
+
+
+def any_neighbor(mask):
+    """
+    Mark the voxels that have at least one of their six face neighbors set in `mask`.
+    Matches the non-wrapping 6-neighborhood used by World.update_cells_on_grid.
+
+    Args:
+        mask (np.ndarray): Boolean mask shaped like the grid.
+
+    Returns:
+        np.ndarray: Boolean mask of voxels with a marked neighbor.
+    """
+    result = np.zeros_like(mask)
+    for axis in range(mask.ndim):
+        lower = [slice(None)] * mask.ndim
+        upper = [slice(None)] * mask.ndim
+        lower[axis] = slice(None, -1)
+        upper[axis] = slice(1, None)
+        result[tuple(upper)] |= mask[tuple(lower)]
+        result[tuple(lower)] |= mask[tuple(upper)]
+    return result
+
+
+def neighbor_values(array, offset, fill=0):
+    """
+    Look up, for every voxel, the value of its neighbor at `offset` (without wrapping around).
+
+    Args:
+        array (np.ndarray): Array shaped like the grid, optionally with trailing axes (e.g. directions).
+        offset (tuple): Neighbor offset (dx, dy, dz), e.g. one of NEIGHBOR_OFFSETS.
+        fill: Value used where the neighbor lies outside the grid.
+
+    Returns:
+        np.ndarray: Array shaped like `array` holding the neighbor values.
+    """
+    result = np.full_like(array, fill)
+    target, source = [], []
+    for delta in offset:
+        if delta > 0:
+            target.append(slice(0, -delta))
+            source.append(slice(delta, None))
+        elif delta < 0:
+            target.append(slice(-delta, None))
+            source.append(slice(0, delta))
+        else:
+            target.append(slice(None))
+            source.append(slice(None))
+    result[tuple(target)] = array[tuple(source)]
+    return result
+
+
+def compute_changed_mask(previous_fields, current_fields, tolerance=0.0):
+    """
+    Mark the voxels whose state differs between two sets of field arrays (see World.get_field_arrays).
+
+    Args:
+        previous_fields (dict): Field arrays before the step.
+        current_fields (dict): Field arrays after the step.
+        tolerance (float): Largest change in temperature, water mass or pollution treated as unchanged.
+
+    Returns:
+        np.ndarray: Boolean mask of changed voxels.
+    """
+    changed = previous_fields["cell_type"] != current_fields["cell_type"]
+    changed |= np.any(previous_fields["direction"] != current_fields["direction"], axis=-1)
+    for name in ("temperature", "water_mass", "pollution_level"):
+        changed |= np.abs(current_fields[name] - previous_fields[name]) > tolerance
+    return changed
+
+
+####################################################################################################################
+###################################### CHUNK OPERATIONS ############################################################
+####################################################################################################################
+
+def reduce_chunks(mask, chunk_size, reduction=np.any):
+    """
+    Reduce a boolean voxel mask over fixed-size cubic chunks.
+    Chunks on the far edges of the grid are partial when the grid size is not a multiple of the chunk size.
+
+    Args:
+        mask (np.ndarray): Boolean mask shaped like the grid.
+        chunk_size (int): Edge length of a chunk, in cells.
+        reduction (callable): np.any or np.all, applied over the cells of each chunk.
+
+    Returns:
+        np.ndarray: Boolean mask with one entry per chunk.
+    """
+    counts = [-(-size // chunk_size) for size in mask.shape]
+    padded = np.full([count * chunk_size for count in counts], reduction is np.all, dtype=bool)
+    padded[tuple(slice(0, size) for size in mask.shape)] = mask
+    blocks = padded.reshape(counts[0], chunk_size, counts[1], chunk_size, counts[2], chunk_size)
+    return reduction(blocks, axis=(1, 3, 5))
+
+
+def expand_chunks(chunk_mask, chunk_size, shape):
+    """
+    Spread a per-chunk boolean mask back onto the cells of each chunk.
+
+    Args:
+        chunk_mask (np.ndarray): Boolean mask with one entry per chunk (see reduce_chunks).
+        chunk_size (int): Edge length of a chunk, in cells.
+        shape (tuple): Shape of the grid.
+
+    Returns:
+        np.ndarray: Boolean mask shaped like the grid.
+    """
+    expanded = chunk_mask
+    for axis in range(chunk_mask.ndim):
+        expanded = np.repeat(expanded, chunk_size, axis=axis)
+    return expanded[tuple(slice(0, size) for size in shape)]
+
+
+####################################################################################################################
+###################################### PRECIPITATION ###############################################################
+####################################################################################################################
+
+def compute_precipitation(cell_type, water_mass):
+    """
+    Resolve the precipitation of every rain voxel at once from a snapshot of the grid.
+
+    A rain voxel above ground (desert, forest or city) is absorbed: the ground takes its water and the rain
+    turns into air. A rain voxel above air moistens it: the air takes its water and the rain dries up.
+    Any other rain voxel keeps falling. All decisions use the types before precipitation, so the result
+    does not depend on the order in which voxels are visited.
+
+    Like the per-cell rule, each rain voxel only looks at the voxel directly below it, rather than scanning its
+    column for the first ground or air voxel: rain falls one voxel per day and lands on a later day.
+
+    Args:
+        cell_type (np.ndarray): Cell types of the grid.
+        water_mass (np.ndarray): Water mass of the grid.
+
+    Returns:
+        tuple: Boolean masks of absorbed, drying and falling rain voxels, and the water mass each voxel
+            receives from the rain voxel above it.
+    """
+    rain = cell_type == 7
+    below = np.full_like(cell_type, -1)
+    below[:, :, 1:] = cell_type[:, :, :-1]
+
+    absorbed = rain & np.isin(below, (1, 4, 5))
+    drying = rain & (below == 6)
+    falling = rain & ~absorbed & ~drying
+
+    received = np.zeros_like(water_mass)
+    received[:, :, :-1] = np.where(absorbed | drying, water_mass, 0.0)[:, :, 1:]
+    return absorbed, drying, falling, received
+
+
+####################################################################################################################
+###################################### WIND ########################################################################
+####################################################################################################################
+
+def compute_wind_field(cell_type, temperature, water_mass, direction, own_temperature=None, altitude=None):
+    """
+    Compute the wind direction of every voxel in one batched pass, matching
+    Particle.calculate_dynamic_wind_direction over the six face neighbors.
+
+    Each cloud, air or rain neighbor pulls the wind along its own direction, weighted by its water mass,
+    by how much warmer it is (/10) and by how much lower it is (/100). The weighted mean direction is
+    rounded to the nearest integer vector, or (0, 0, 0) if no neighbor has any influence.
+
+    Args:
+        cell_type (np.ndarray): Cell types of the grid.
+        temperature (np.ndarray): Temperature of the grid.
+        water_mass (np.ndarray): Water mass of the grid.
+        direction (np.ndarray): Directions of the grid, with a trailing axis of size 3.
+        own_temperature (np.ndarray, optional): Temperature each voxel has when it evaluates the wind
+            (e.g. after warming up). Defaults to `temperature`.
+        altitude (np.ndarray, optional): Elevation (position z) of each voxel. Defaults to its z index.
+
+    Returns:
+        np.ndarray: Wind directions (int8), shaped like `direction`.
+    """
+    if own_temperature is None:
+        own_temperature = temperature
+    if altitude is None:
+        altitude = np.broadcast_to(np.arange(cell_type.shape[2], dtype=np.float64), cell_type.shape)
+
+    weighted = np.zeros(direction.shape, dtype=np.float64)
+    total_influence = np.zeros(cell_type.shape, dtype=np.float64)
+    for offset in NEIGHBOR_OFFSETS:
+        fluid = np.isin(neighbor_values(cell_type, offset, fill=-1), (2, 6, 7))  # Cloud, Air, Rain
+        temperature_influence = np.maximum(neighbor_values(temperature, offset) - own_temperature, 0) / 10.0
+        altitude_influence = np.maximum(altitude - neighbor_values(altitude, offset), 0) / 100.0
+        influence = neighbor_values(water_mass, offset) + temperature_influence + altitude_influence
+        influence = np.where(fluid, influence, 0.0)
+
+        weighted += neighbor_values(direction, offset) * influence[..., None]
+        total_influence += influence
+
+    significant = total_influence > 0
+    normalized = np.divide(weighted, total_influence[..., None], out=np.zeros_like(weighted),
+                           where=significant[..., None])
+    return np.round(normalized).astype(np.int8)
+
+
+####################################################################################################################
+###################################### NEIGHBOR HISTOGRAMS #########################################################
+####################################################################################################################
+
+def count_neighbor_types(cell_type, altitude=None, present=None, type_count=10):
+    """
+    Count, for every voxel, its face neighbors of each cell type, split by elevation relative to the voxel
+    into below, aligned and above groups (see core.Neighborhood).
+
+    Args:
+        cell_type (np.ndarray): Cell types of the grid.
+        altitude (np.ndarray, optional): Elevation (position z) of each voxel. Defaults to its z index.
+        present (np.ndarray, optional): Boolean mask of voxels that count as neighbors. Defaults to all of them.
+        type_count (int): Number of cell type slots.
+
+    Returns:
+        np.ndarray: Counts (uint8) shaped (X, Y, Z, 3, type_count).
+    """
+    if altitude is None:
+        altitude = np.broadcast_to(np.arange(cell_type.shape[2], dtype=np.float64), cell_type.shape)
+    if present is None:
+        present = np.ones(cell_type.shape, dtype=bool)
+
+    counts = np.zeros((*cell_type.shape, 3, type_count), dtype=np.uint8)
+    for offset in NEIGHBOR_OFFSETS:
+        neighbor_present = neighbor_values(present, offset, fill=False)
+        group = np.sign(neighbor_values(altitude, offset) - altitude).astype(np.int64) + 1
+        neighbor_type = neighbor_values(cell_type, offset).astype(np.int64)
+        voxels = np.nonzero(neighbor_present)
+        # Each voxel has a single neighbor at a given offset, so the indices below are unique
+        counts[voxels + (group[voxels], neighbor_type[voxels])] += 1
+    return counts
+
+
+####################################################################################################################
+###################################### PACKED STORAGE ##############################################################
+####################################################################################################################
+
+def pack_cells(cell_type, direction):
+    """
+    Pack cell types and directions into one uint16 per voxel: the cell type in the low 4 bits and the
+    direction code (dx + 1) * 9 + (dy + 1) * 3 + (dz + 1), one of 27 values, in the next 5 bits.
+
+    Args:
+        cell_type (np.ndarray): Cell types of the grid (0-15).
+        direction (np.ndarray): Directions of the grid (components in {-1, 0, 1}), with a trailing axis of size 3.
+
+    Returns:
+        np.ndarray: Packed cells (uint16) shaped like the grid.
+
+    Raises:
+        ValueError: If a cell type or a direction component is out of range.
+    """
+    if np.any((cell_type < 0) | (cell_type > 15)) or np.any(np.abs(direction) > 1):
+        raise ValueError("Cell types must be in 0-15 and direction components in {-1, 0, 1} to be packed.")
+    direction = (direction.astype(np.int16) + 1).astype(np.uint16)  # {-1, 0, 1} -> {0, 1, 2}
+    code = direction[..., 0] * 9 + direction[..., 1] * 3 + direction[..., 2]
+    return cell_type.astype(np.uint16) | (code << 4)
+
+
+def unpack_cells(packed):
+    """
+    Unpack cell types and directions packed by pack_cells.
+
+    Args:
+        packed (np.ndarray): Packed cells (uint16).
+
+    Returns:
+        tuple: Cell types (int8) shaped like `packed`, and directions (int8) with a trailing axis of size 3.
+    """
+    cell_type = (packed & 0xF).astype(np.int8)
+    code = (packed >> 4).astype(np.int8)
+    direction = np.stack((code // 9 - 1, code // 3 % 3 - 1, code % 3 - 1), axis=-1)
+    return cell_type, direction
+
+
+def hash_fields(fields, decimals=6):
+    """
+    Hash per-voxel field arrays (see World.get_field_arrays), rounding floating-point values first so that
+    states equal up to the given precision hash identically.
+
+    Args:
+        fields (dict): Field arrays, including all of "cell_type", "direction", "temperature", "water_mass"
+            and "pollution_level".
+        decimals (int): Number of decimals kept for temperature, water mass and pollution.
+
+    Returns:
+        str: Hex digest identifying the state.
+    """
+    digest = hashlib.blake2b(digest_size=16)
+    for name in ("cell_type", "direction"):
+        digest.update(fields[name].tobytes())
+    for name in ("temperature", "water_mass", "pollution_level"):
+        # Adding 0.0 folds -0.0 into 0.0 so both round to the same bytes
+        digest.update((np.round(fields[name], decimals) + 0.0).tobytes())
+    return digest.hexdigest()
+
+
+####################################################################################################################
+###################################### TRANSITIONS #################################################################
+####################################################################################################################
+
+def count_transitions(old_types, new_types, type_count=10):
+    """
+    Count cell type transitions in a single pass.
+
+    Args:
+        old_types (np.ndarray): Cell types before the update.
+        new_types (np.ndarray): Cell types after the update, at the same positions as `old_types`.
+        type_count (int): Number of cell types.
+
+    Returns:
+        np.ndarray: (type_count, type_count) int64 matrix; entry [a, b] is the number of cells of type a that
+            became type b. Row sums give the number of cells of each type that were updated.
+    """
+    pairs = np.asarray(old_types, dtype=np.int64) * type_count + np.asarray(new_types, dtype=np.int64)
+    return np.bincount(pairs.ravel(), minlength=type_count * type_count).reshape(type_count, type_count)
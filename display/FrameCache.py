@@ -0,0 +1,148 @@
+import threading
+import numpy as np
+from collections import OrderedDict
+from concurrent.futures import ThreadPoolExecutor
+from .frames import build_palette, prepare_frame
+
+
+def frame_nbytes(frame):
+    """
+    Count the bytes taken by the arrays of a frame.
+
+    Args:
+        frame (dict): A frame (see frames.prepare_frame).
+
+    Returns:
+        int: Number of bytes.
+    """
+    return sum(values.nbytes for values in frame.values() if isinstance(values, np.ndarray))
+
+
+class FrameCache:
+    """
+    Least-recently-used cache of 3D view frames (see frames.prepare_frame), computed on demand.
+
+    A frame is only computed when a day is first requested, and the cache drops the least recently used frames
+    once their arrays take more than the memory cap. Days about to be viewed (e.g. the ones adjacent to the
+    current day) can be prefetched by a background thread, so that stepping through days does not wait for them.
+    """
+
+    def __init__(self, simulation, config, max_bytes=256 * 2 ** 20, **frame_options):
+        """
+        Initialize the FrameCache class.
+
+        Args:
+            simulation (Simulation): The simulation whose states are drawn; states added later are picked up.
+            config (dict): Configuration holding the colors and baselines.
+            max_bytes (int): Memory cap of the cached frame arrays. The most recent frame is always kept.
+            **frame_options: Options passed to frames.prepare_frame (e.g. surface_only=True).
+        """
+        self.simulation = simulation
+        self.config = config
+        self.max_bytes = max_bytes
+        self.frame_options = frame_options
+        self.generation = 0  # Incremented whenever the frame options change, so stale prefetches are not cached
+        self.palette = build_palette(config["base_colors"])
+        self.frames = OrderedDict()  # Day -> frame, least recently used first
+        self.nbytes = 0
+        self.pending = {}  # Day -> Future of a prefetch in progress
+        self.lock = threading.Lock()
+        self.executor = ThreadPoolExecutor(max_workers=1, thread_name_prefix="frame-prefetch")
+        self.closed = False  # Set by close(): frames are then only computed on demand
+
+    def get(self, day):
+        """
+        Get the frame of a day, computing it if it is neither cached nor being prefetched.
+
+        Args:
+            day (int): The day to draw.
+
+        Returns:
+            dict: The frame (see frames.prepare_frame), or None if the day's state left the simulation's history
+                ring (see the "history_limit" option).
+        """
+        with self.lock:
+            if day in self.frames:
+                self.frames.move_to_end(day)
+                return self.frames[day]
+            future = self.pending.get(day)
+        if future is not None:
+            return future.result()
+        return self._compute(day, self.generation, self.frame_options)
+
+    def prefetch(self, days):
+        """
+        Compute the frames of the given days in the background, unless they are cached or already queued.
+
+        Args:
+            days (iterable): Days to prefetch; days that have not been simulated or are no longer stored are ignored.
+        """
+        with self.lock:
+            if self.closed:
+                return
+            for day in days:
+                if (self.simulation.first_stored_day <= day < len(self.simulation.states)
+                        and day not in self.frames and day not in self.pending):
+                    self.pending[day] = self.executor.submit(self._compute, day, self.generation, self.frame_options)
+
+    def clear(self):
+        """
+        Drop all cached frames (e.g. after the colors changed).
+        """
+        with self.lock:
+            self.frames.clear()
+            self.pending.clear()
+            self.nbytes = 0
+            self.generation += 1
+
+    def set_frame_options(self, **frame_options):
+        """
+        Change the options passed to frames.prepare_frame, dropping the frames computed with the previous ones.
+
+        Args:
+            **frame_options: Options replacing the current ones (e.g. surface_only=False).
+        """
+        with self.lock:
+            self.frame_options = dict(self.frame_options, **frame_options)
+        self.clear()
+
+    def close(self):
+        """
+        Stop the prefetch thread, dropping the prefetches that have not started. The cache can still compute
+        frames on demand afterwards.
+        """
+        with self.lock:
+            self.closed = True
+            self.pending.clear()
+        self.executor.shutdown(wait=False, cancel_futures=True)
+
+    def _compute(self, day, generation, frame_options):
+        """
+        Compute a frame and store it in the cache, evicting the least recently used frames over the memory cap.
+
+        Args:
+            day (int): The day to draw.
+            generation (int): Generation of the frame options the frame is computed with.
+            frame_options (dict): Options passed to frames.prepare_frame.
+
+        Returns:
+            dict: The frame, or None if the day's state is no longer stored.
+        """
+        state = self.simulation.states[day]
+        if state is None:
+            with self.lock:
+                self.pending.pop(day, None)
+            return None
+        frame = prepare_frame(state, self.config, self.palette, **frame_options)
+        with self.lock:
+            if generation != self.generation:
+                return frame  # The options changed while computing: the frame is not cached
+            self.pending.pop(day, None)
+            if day not in self.frames:
+                self.frames[day] = frame
+                self.nbytes += frame_nbytes(frame)
+            self.frames.move_to_end(day)
+            while self.nbytes > self.max_bytes and len(self.frames) > 1:
+                _, evicted = self.frames.popitem(last=False)
+                self.nbytes -= frame_nbytes(evicted)
+            return self.frames.get(day, frame)
@@ -1,19 +1,36 @@
 import matplotlib.pyplot as plt
 import numpy as np
 import logging
+import queue
 from utils.helpers import format_config_value,  rgba_to_hex
 import tkinter as tk
 from tkinter import ttk
 from matplotlib.backends.backend_tkagg import FigureCanvasTkAgg
+from matplotlib.collections import PolyCollection
 import matplotlib.pyplot as plt
 from config.Config import config_instance
 from config.presets import KEY_LABELS, PARTICLE_MAPPING
+from .frames import build_palette, prepare_frame, prepare_slice, SLICE_AXES, SLICE_FIELDS
+from .FrameCache import FrameCache
+from .series import standardize, decimate_minmax, decimate_envelope
+
+# Interval between two checks for days streamed by a SimulationWorker, in milliseconds
+WORKER_POLL_INTERVAL_MS = 100
 
 
 class MatplotlibDisplay:
 
-    def __init__(self, simulation):
-        self.config = config_instance.get()  # Access the centralized configuration
+    def __init__(self, simulation, worker=None, config=None):
+        """
+        Initialize the MatplotlibDisplay class.
+
+        Args:
+            simulation (Simulation): The simulation to display.
+            worker (SimulationWorker, optional): Worker running the simulation in the background. Only the days
+                it has reported are shown, and the display extends as more days arrive.
+            config (dict, optional): Configuration of the display. Defaults to the centralized configuration.
+        """
+        self.config = config if config is not None else config_instance.get()  # Access the centralized configuration
         self.simulation = simulation
         self.precomputed_results = simulation.states
         self.fig = None
@@ -23,13 +40,35 @@ class MatplotlibDisplay:
         self.three_d_window = None
         self.main_window = None
         self.precomputed_data = []  # לשמירת הנתונים לגרף ה-3D
-        self.days = range(len(simulation.states))
+        self.worker = worker
+        self.days = range(0) if worker is not None else range(len(simulation.states))
+        self.progress_label = None
         self.tint = False  # Tint state (False for untinted, True for tinted)
+        # Only draw the voxels that can be seen, i.e. with a face exposed to a see-through cell
+        self.surface_only = self.config.get("surface_culling", True)
+        # Frames of the 3D view are computed on demand and cached (unless precompute_visualizations filled them all)
+        # Large grids are drawn at a coarser level of detail (blocks of voxels) to stay within a point budget,
+        # except in an optional region kept at full resolution
+        self.frame_cache = FrameCache(
+            simulation, self.config, max_bytes=int(self.config.get("frame_cache_mb", 256) * 2 ** 20),
+            surface_only=self.surface_only, block_size=None, max_points=self.config.get("max_points_3d", 50000),
+            region=None)
+        self.region_entry = None
+        # 2D slice view state: plane orientation and position, shown field and day
+        self.slice_window = None
+        self.slice_axis = "z"
+        self.slice_index = 0
+        self.slice_field = "cell_type"
+        self.slice_day = 0
+        self.slice_fields = None  # (day, field arrays) of the day shown in the slice view
+        # Time-series panels: persistent artists of each axes, updated in place and redrawn by blitting
+        self.panels = {}  # Axes -> {"line", "fill"}
+        self.panel_background = None  # Figure pixels without the panel artists, saved on every full draw
+        self.panels_need_full_draw = True  # Set when a panel's limits changed, which the background cannot show
+        self.standardized_series = {}  # Series name -> (length, z-scores)
 
     def render_graphic_user_interface(self):
         """Create a scrollable and resizable window with compact graphs."""
-        self.precompute_visualizations()
-
         # Initialize main Tkinter window
         self.main_window = tk.Tk()
         self.main_window.title(
@@ -52,6 +91,18 @@ class MatplotlibDisplay:
                   command=self.bring_3d_to_front).pack(side=tk.LEFT, padx=5)
         tk.Button(control_frame, text="Hide 3D Grid",
                   command=self.minimize_3d_window).pack(side=tk.LEFT, padx=5)
+        tk.Button(control_frame, text="Show 2D Slice",
+                  command=self.bring_slice_to_front).pack(side=tk.LEFT, padx=5)
+        if self.worker is not None:
+            # Simulation controls: the worker advances the engine on demand
+            tk.Button(control_frame, text="Play", command=self.worker.play).pack(side=tk.LEFT, padx=5)
+            tk.Button(control_frame, text="Pause", command=self.worker.pause).pack(side=tk.LEFT, padx=5)
+            tk.Button(control_frame, text="Step", command=self.worker.step).pack(side=tk.LEFT, padx=5)
+            self.run_to_day_entry = tk.Entry(control_frame, width=6)
+            self.run_to_day_entry.pack(side=tk.LEFT, padx=(10, 2))
+            tk.Button(control_frame, text="Run To Day", command=self.run_to_day).pack(side=tk.LEFT, padx=5)
+        self.progress_label = tk.Label(control_frame, text="")
+        self.progress_label.pack(side=tk.LEFT, padx=10)
 
         # Create a scrollable canvas
         scrollable_canvas = tk.Canvas(self.main_window, highlightthickness=0)
@@ -131,6 +182,91 @@ class MatplotlibDisplay:
             "std_dev_water_mass": self.fig.add_subplot(gs[4, 2]),
         }
 
+        self.canvas.mpl_connect("draw_event", self.on_panels_draw)
+        self.render_panels()
+
+        # Add 3D visualization (once day 0 exists) and config table
+        if self.days:
+            self.open_3d_in_new_window(self.main_window)
+        self.add_config_table_with_scrollbar(self.main_window)
+        if self.worker is not None:
+            self.progress_label.configure(text="Simulating...")
+            self.main_window.after(WORKER_POLL_INTERVAL_MS, self.poll_worker)
+
+        # Start the Tkinter main loop
+        self.main_window.mainloop()
+
+    def close(self):
+        """Stop the background work of the display (the 3D frame prefetching) once its windows are closed."""
+        self.frame_cache.close()
+
+    def poll_worker(self):
+        """
+        Show the days the simulation worker finished since the last check, and check again later.
+        Runs in the Tk main loop, so the windows stay responsive while the simulation runs.
+        """
+        last_day = None
+        paused = False
+        try:
+            while True:
+                kind, value = self.worker.queue.get_nowait()
+                if kind == "error":
+                    self.progress_label.configure(text=f"Simulation failed: {value}")
+                    return  # The worker thread has stopped: nothing more will come
+                last_day = value
+                paused = kind == "paused"
+        except queue.Empty:
+            pass
+
+        try:
+            if last_day is not None:
+                if last_day >= len(self.days):
+                    self.extend_days(last_day)
+                if paused:
+                    self.progress_label.configure(text=f"Paused on day {last_day}")
+                else:
+                    self.progress_label.configure(text=f"Simulating... day {last_day} of {self.simulation.days}")
+        except Exception as error:
+            # The worker keeps running: report the failure and keep showing the next days
+            logging.error(f"Display update failed: {error}")
+            self.progress_label.configure(text=f"Display update failed: {error}")
+        finally:
+            self.main_window.after(WORKER_POLL_INTERVAL_MS, self.poll_worker)
+
+    def extend_days(self, last_day):
+        """
+        Extend the displayed days up to a newly simulated day: the panels, the day controls of the 3D and slice
+        views, and the 3D view itself, which opens once day 0 is available. A 3D view showing the latest day
+        follows the new days, and days dropped from the history ring can no longer be shown.
+
+        Args:
+            last_day (int): Last day whose state and aggregates are stored.
+        """
+        following = self.current_day == len(self.days) - 1
+        self.days = range(last_day + 1)
+        self.render_panels()
+        if self.three_d_window is None:
+            self.open_3d_in_new_window(self.main_window)
+        elif self.three_d_window.winfo_exists() and (
+                following or self.current_day < self.simulation.first_stored_day):
+            self.current_day = last_day if following else self.simulation.first_stored_day
+            self.render_day(self.current_day)
+        if self.slice_window is not None and self.slice_window.winfo_exists():
+            self.slice_day_scale.configure(from_=self.simulation.first_stored_day, to=last_day)
+
+    def run_to_day(self):
+        """Advance the simulation to the day typed in the run-to-day entry."""
+        text = self.run_to_day_entry.get().strip()
+        if not text.isdigit():
+            logging.info(f"Invalid day to run to: {text!r}")
+            return
+        self.worker.run_to_day(int(text))
+
+    def render_panels(self):
+        """
+        Update the time-series panels with the current series and redraw them, by blitting the changed
+        artists over the saved background when no axes limits changed.
+        """
         # Render standardized graphs
         self.render_standardized_pollution_graph(
             self.axes["std_pollution"], color="black")
@@ -166,12 +302,34 @@ class MatplotlibDisplay:
         self.render_std_dev_water_mass_graph(
             self.axes["std_dev_water_mass"], color="cyan")
 
-        # Add 3D visualization and config table
-        self.open_3d_in_new_window(self.main_window)
-        self.add_config_table_with_scrollbar(self.main_window)
+        self.refresh_panels()
 
-        # Start the Tkinter main loop
-        self.main_window.mainloop()
+    def refresh_panels(self):
+        """Redraw the time-series panels, with a full draw only when the saved background is stale."""
+        if self.panels_need_full_draw or self.panel_background is None:
+            self.canvas.draw_idle()  # on_panels_draw saves the new background
+            return
+        self.canvas.restore_region(self.panel_background)
+        self.draw_panel_artists()
+        self.canvas.blit(self.canvas.figure.bbox)
+
+    def on_panels_draw(self, event):
+        """
+        Save the background of the time-series panels after a full draw and draw their artists on top of it.
+
+        Args:
+            event (matplotlib.backend_bases.DrawEvent): The draw event of the main figure.
+        """
+        self.panel_background = self.canvas.copy_from_bbox(self.canvas.figure.bbox)
+        self.draw_panel_artists()
+        self.panels_need_full_draw = False
+
+    def draw_panel_artists(self):
+        """Draw the (animated) artists of all time-series panels onto the canvas."""
+        for ax, artists in self.panels.items():
+            if artists["fill"] is not None:
+                ax.draw_artist(artists["fill"])
+            ax.draw_artist(artists["line"])
 
     def open_3d_in_new_window(self, root=None):
         """
@@ -183,6 +341,13 @@ class MatplotlibDisplay:
         three_d_window.geometry("1280x600")  # Default size
         three_d_window.minsize(1000, 600)  # Minimum size
 
+        def close_3d_window():
+            """Stop prefetching 3D frames once the window that shows them is gone."""
+            self.frame_cache.close()
+            three_d_window.destroy()
+
+        three_d_window.protocol("WM_DELETE_WINDOW", close_3d_window)
+
         # Configure flexible resizing
         three_d_window.columnconfigure(0, weight=1)
         three_d_window.rowconfigure(0, weight=0)  # Control buttons
@@ -206,6 +371,17 @@ class MatplotlibDisplay:
             command=lambda: self.toggle_tint(False),
         ).pack(side=tk.LEFT, padx=5, pady=5)
 
+        tk.Button(
+            control_frame,
+            text="Show Surface Only",
+            command=lambda: self.toggle_surface_only(True),
+        ).pack(side=tk.LEFT, padx=5, pady=5)
+        tk.Button(
+            control_frame,
+            text="Show All Voxels",
+            command=lambda: self.toggle_surface_only(False),
+        ).pack(side=tk.LEFT, padx=5, pady=5)
+
         tk.Button(
             control_frame,
             text="Show Statistics Graphs (Main Window)",
@@ -218,6 +394,17 @@ class MatplotlibDisplay:
         tk.Button(control_frame, text="Next Day", command=self.next_day).pack(
             side=tk.LEFT, padx=5, pady=5)
 
+        # Level of detail controls: full resolution everywhere, or automatic with an optional full-resolution region
+        tk.Button(control_frame, text="Full Resolution", command=lambda: self.set_level_of_detail(1)).pack(
+            side=tk.LEFT, padx=5, pady=5)
+        tk.Button(control_frame, text="Auto Level Of Detail", command=lambda: self.set_level_of_detail(None)).pack(
+            side=tk.LEFT, padx=5, pady=5)
+        tk.Label(control_frame, text="Region (x0:x1, y0:y1, z0:z1):").pack(side=tk.LEFT, padx=(10, 2), pady=5)
+        self.region_entry = tk.Entry(control_frame, width=18)
+        self.region_entry.pack(side=tk.LEFT, padx=2, pady=5)
+        tk.Button(control_frame, text="Full Resolution Region", command=self.apply_region).pack(
+            side=tk.LEFT, padx=5, pady=5)
+
         # Create a Matplotlib figure with GridSpec for 3D plot and legend
         fig = plt.Figure(figsize=(10, 6))
         gs = fig.add_gridspec(1, 2, width_ratios=[4, 1], wspace=0.4)
@@ -228,6 +415,9 @@ class MatplotlibDisplay:
         ax_3d.set_xlabel("X Axis")
         ax_3d.set_ylabel("Y Axis")
         ax_3d.set_zlabel("Z Axis")
+        # The axes keep the extent of the grid, whatever the points drawn on a given day
+        for set_limits, size in zip((ax_3d.set_xlim, ax_3d.set_ylim, ax_3d.set_zlim), self.simulation.grid_size):
+            set_limits(-0.5, size - 0.5)
 
         # Legend area
         ax_color_map = fig.add_subplot(gs[0, 1])
@@ -257,8 +447,9 @@ class MatplotlibDisplay:
         canvas.get_tk_widget().grid(row=1, column=0, sticky="nsew", padx=5, pady=5)
         canvas.draw()
 
-        # Save axes for future updates
+        # Save axes for future updates (the scatter is created by the first render_day, then updated in place)
         self.ax_3d = ax_3d
+        self.scatter_3d = None
         self.ax_color_map = ax_color_map
         self.fig = fig
 
@@ -266,11 +457,11 @@ class MatplotlibDisplay:
         def handle_key_press(event):
             """Handle key presses for navigating between days in the separate window."""
             if event.key == "right":  # Move to the next day
-                if self.current_day < len(self.simulation.states) - 1:
+                if self.current_day < len(self.days) - 1:
                     self.current_day += 1
                     self.render_day(self.current_day)
             elif event.key == "left":  # Move to the previous day
-                if self.current_day > 0:
+                if self.current_day > self.simulation.first_stored_day:
                     self.current_day -= 1
                     self.render_day(self.current_day)
 
@@ -280,6 +471,124 @@ class MatplotlibDisplay:
         # Render the first day with the default tinting state
         self.render_day(self.current_day)
 
+    def open_slice_in_new_window(self, root=None):
+        """
+        Open a window showing one plane of the grid as an image, colored by cell type or by a field,
+        with controls to pick the plane orientation and position, the field and the day.
+        """
+        slice_window = tk.Toplevel(root)
+        slice_window.title("2D Slice")
+        slice_window.geometry("900x700")
+        slice_window.columnconfigure(0, weight=1)
+        slice_window.rowconfigure(1, weight=1)
+        self.slice_window = slice_window
+        self.slice_day = self.current_day
+
+        control_frame = tk.Frame(slice_window)
+        control_frame.grid(row=0, column=0, sticky="ew", padx=5, pady=5)
+
+        tk.Label(control_frame, text="Plane:").pack(side=tk.LEFT, padx=(5, 2))
+        axis_box = ttk.Combobox(control_frame, values=SLICE_AXES, width=3, state="readonly")
+        axis_box.set(self.slice_axis)
+        axis_box.pack(side=tk.LEFT, padx=2)
+
+        tk.Label(control_frame, text="Field:").pack(side=tk.LEFT, padx=(10, 2))
+        field_box = ttk.Combobox(control_frame, values=SLICE_FIELDS, width=16, state="readonly")
+        field_box.set(self.slice_field)
+        field_box.pack(side=tk.LEFT, padx=2)
+
+        index_scale = tk.Scale(control_frame, label="Slice", orient=tk.HORIZONTAL, length=200,
+                               command=lambda value: self.set_slice(index=int(value)))
+        index_scale.pack(side=tk.LEFT, padx=10)
+        day_scale = tk.Scale(control_frame, label="Day", orient=tk.HORIZONTAL, length=300,
+                             from_=0, to=len(self.days) - 1,
+                             command=lambda value: self.set_slice(day=int(value)))
+        day_scale.set(self.slice_day)
+        day_scale.pack(side=tk.LEFT, padx=10)
+
+        def update_index_range():
+            size = self.simulation.grid_size[SLICE_AXES.index(self.slice_axis)]
+            self.slice_index = min(self.slice_index, size - 1)
+            index_scale.configure(from_=0, to=size - 1)
+            index_scale.set(self.slice_index)
+
+        def on_axis_selected(event):
+            self.slice_axis = axis_box.get()
+            update_index_range()
+            self.set_slice(rebuild=True)
+
+        axis_box.bind("<<ComboboxSelected>>", on_axis_selected)
+        field_box.bind("<<ComboboxSelected>>", lambda event: self.set_slice(field=field_box.get(), rebuild=True))
+        self.slice_day_scale = day_scale
+
+        fig = plt.Figure(figsize=(8, 6))
+        self.ax_slice = fig.add_subplot(111)
+        self.slice_image = None
+        self.slice_colorbar = None
+        self.slice_fig = fig
+        canvas = FigureCanvasTkAgg(fig, master=slice_window)
+        canvas.get_tk_widget().grid(row=1, column=0, sticky="nsew", padx=5, pady=5)
+
+        update_index_range()
+        self.set_slice(rebuild=True)
+
+    def set_slice(self, day=None, index=None, field=None, rebuild=False):
+        """
+        Change the day, plane position or field of the slice view and update its image.
+
+        Args:
+            day (int, optional): Day to show.
+            index (int, optional): Position of the plane along its axis.
+            field (str, optional): Field to show (see frames.SLICE_FIELDS).
+            rebuild (bool): Recreate the image (needed when its shape or kind changes). Defaults to False.
+        """
+        if day is not None:
+            self.slice_day = min(max(day, self.simulation.first_stored_day), len(self.days) - 1)
+        if index is not None:
+            self.slice_index = index
+        if field is not None:
+            self.slice_field = field
+        if self.slice_window is None or not self.slice_window.winfo_exists():
+            return
+        self.render_slice(rebuild)
+
+    def render_slice(self, rebuild=False):
+        """
+        Draw the current plane of the slice view, updating the image data in place unless it must be rebuilt.
+
+        Args:
+            rebuild (bool): Recreate the image, axes labels and color bar. Defaults to False.
+        """
+        if self.slice_fields is None or self.slice_fields[0] != self.slice_day:
+            self.slice_day, state = self.simulation.get_stored_state(self.slice_day)
+            self.slice_fields = (self.slice_day, state.get_field_arrays(SLICE_FIELDS))
+        fields = self.slice_fields[1]
+        image = prepare_slice(
+            fields, self.slice_axis, self.slice_index, self.slice_field, self.frame_cache.palette)
+
+        if rebuild or self.slice_image is None:
+            if self.slice_colorbar is not None:
+                self.slice_colorbar.remove()
+                self.slice_colorbar = None
+            self.ax_slice.cla()
+            columns, rows = (name for name in SLICE_AXES if name != self.slice_axis)
+            self.ax_slice.set_xlabel(f"{columns.upper()} Axis")
+            self.ax_slice.set_ylabel(f"{rows.upper()} Axis")
+            if self.slice_field == "cell_type":
+                self.slice_image = self.ax_slice.imshow(image, origin="lower", interpolation="nearest")
+            else:
+                self.slice_image = self.ax_slice.imshow(image, origin="lower", interpolation="nearest", cmap="inferno")
+                self.slice_colorbar = self.slice_fig.colorbar(self.slice_image, ax=self.ax_slice)
+        else:
+            self.slice_image.set_data(image)
+        if self.slice_field != "cell_type":
+            # The color scale spans the whole grid of the day, so planes of the same day compare directly
+            values = fields[self.slice_field]
+            self.slice_image.set_clim(float(values.min()), float(values.max()))
+        self.ax_slice.set_title(
+            f"Day {self.slice_day}: {self.slice_field} at {self.slice_axis} = {self.slice_index}")
+        self.slice_fig.canvas.draw_idle()
+
     def add_config_table_with_scrollbar(self, root=None):
         """Create a configuration table window with scrollbars and add control buttons."""
         # Create a new window for the configuration table
@@ -388,33 +697,31 @@ class MatplotlibDisplay:
 
     def precompute_visualizations(self):
         """
-        Precompute 3D visualization data for all days.
+        Precompute 3D visualization data for all days at once. Optional: the 3D view otherwise computes each
+        day's data when it is first shown (see get_frame).
+        Points and colors are computed from each day's field arrays at once: base colors are looked up in a
+        palette indexed by cell type and the pollution/temperature tint is applied to whole arrays (see frames.py).
         """
+        palette = build_palette(self.config["base_colors"])
         for state in self.simulation.states:
-            points = []
-            untinted_colors = []
-            tinted_colors = []
-            sizes = []
-
-            for x in range(state.grid.shape[0]):
-                for y in range(state.grid.shape[1]):
-                    for z in range(state.grid.shape[2]):
-                        cell = state.grid[x][y][z]
-                        base_color = cell.get_base_color()
-                        tinted_color = cell.get_color_tinted_by_attributes()
-
-                        if base_color:
-                            points.append((x, y, z))
-                            untinted_colors.append(base_color)
-                            tinted_colors.append(tinted_color)
-                            sizes.append(200.0)  # Adjust size as needed
-
-            self.precomputed_data.append({
-                "points": points,
-                "untinted_colors": untinted_colors,
-                "tinted_colors": tinted_colors,
-                "sizes": sizes
-            })
+            # Days dropped from the history ring (see the "history_limit" option) have no state left to draw
+            self.precomputed_data.append(
+                prepare_frame(state, self.config, palette, **self.frame_cache.frame_options) if state is not None else None)
+
+    def get_frame(self, day):
+        """
+        Get the 3D visualization data of a day, from precompute_visualizations if it was run, or else from the
+        frame cache, which computes it on demand.
+
+        Args:
+            day (int): The day to draw.
+
+        Returns:
+            dict: The frame (see frames.prepare_frame), or None if the day is no longer stored.
+        """
+        if day < len(self.precomputed_data):
+            return self.precomputed_data[day]
+        return self.frame_cache.get(day)
 
     def render_day(self, day):
         """
@@ -423,31 +730,27 @@ class MatplotlibDisplay:
         Args:
             day (int): The day to render.
         """
-        # Save the current viewing angles
-        if self.ax_3d:
-            self.current_elev = self.ax_3d.elev
-            self.current_azim = self.ax_3d.azim
-
-        # Clear the existing plot
-        self.ax_3d.cla()
-        self.ax_3d.set_title(f"Day {day}")
-        self.ax_3d.set_xlabel("X Axis")
-        self.ax_3d.set_ylabel("Y Axis")
-        self.ax_3d.set_zlabel("Z Axis")
-
-        # Fetch precomputed data for the current day
-        data = self.precomputed_data[day]
+        # Fetch the data of the current day, and prepare the adjacent days in the background. A simulation running
+        # with a history ring may drop the day's state meanwhile, in which case the oldest stored day is shown
+        data = None
+        while data is None:
+            day = max(day, self.simulation.first_stored_day)
+            data = self.get_frame(day)
+        self.current_day = day
+        self.frame_cache.prefetch((day + 1, day - 1))
         points = data["points"]
         colors = data["tinted_colors" if self.tint else "untinted_colors"]
         sizes = data["sizes"]
 
-        xs, ys, zs = zip(*points) if points else ([], [], [])
-        self.ax_3d.scatter(xs, ys, zs, c=colors, s=sizes)
-
-        # Restore the saved viewing angles
-        if hasattr(self, "current_elev") and hasattr(self, "current_azim"):
-            self.ax_3d.view_init(elev=self.current_elev,
-                                 azim=self.current_azim)
+        # Update the persistent scatter in place; the axes, decorations and viewing angles are left untouched
+        if self.scatter_3d is None:
+            self.scatter_3d = self.ax_3d.scatter(points[:, 0], points[:, 1], points[:, 2], c=colors, s=sizes)
+        else:
+            self.scatter_3d._offsets3d = (points[:, 0], points[:, 1], points[:, 2])
+            self.scatter_3d.set_facecolor(colors)
+            self.scatter_3d.set_sizes(sizes)
+        block_size = data.get("block_size", 1)
+        self.ax_3d.title.set_text(f"Day {day}" + (f" (blocks of {block_size}³ voxels)" if block_size > 1 else ""))
 
         self.fig.canvas.draw_idle()
 
@@ -455,6 +758,10 @@ class MatplotlibDisplay:
         """
         Render a generic graph with optional standard deviation shading.
 
+        The line and shading are created once per Axes and then updated in place. They are animated artists,
+        drawn by draw_panel_artists over the saved background, and series with more than two points per pixel
+        are decimated (min/max per pixel) first.
+
         Args:
             ax (matplotlib.axes.Axes): The Axes to draw the graph on.
             title (str): Title of the graph.
@@ -467,24 +774,64 @@ class MatplotlibDisplay:
             label (str, optional): Label for the main line. Defaults to None.
             fill_label (str, optional): Label for the shaded area. Defaults to None.
         """
-        ax.cla()
-        ax.set_title(title)
-        ax.set_xlabel(xlabel)
-        ax.set_ylabel(ylabel)
-
-        if len(days) == len(data):
+        if len(data) < len(days):
+            logging.info(f"Data length mismatch in graph: {title}")
+            return
+        # A simulation running in the background may already have moved past the displayed days
+        data = data[:len(days)]
+
+        artists = self.panels.get(ax)
+        if artists is None:
+            ax.set_title(title)
+            ax.set_xlabel(xlabel)
+            ax.set_ylabel(ylabel)
+            fill = None
             if std_dev is not None:
-                ax.fill_between(
-                    days,
-                    np.array(data) - np.array(std_dev),
-                    np.array(data) + np.array(std_dev),
-                    color=color, alpha=0.2, label=fill_label
-                )
-            ax.plot(days, data, color=color, label=label)
+                fill = PolyCollection([], facecolors=color, alpha=0.2, label=fill_label, animated=True)
+                ax.add_collection(fill, autolim=False)
+            line, = ax.plot([], [], color=color, label=label, animated=True)
             if label or fill_label:
                 ax.legend()
-        else:
-            logging.info(f"Data length mismatch in graph: {title}")
+            artists = self.panels[ax] = {"line": line, "fill": fill}
+
+        bins = int(ax.bbox.width)
+        days = np.asarray(days)
+        data = np.asarray(data, dtype=np.float64)
+        y_values = [data]
+        if artists["fill"] is not None and std_dev is not None and len(std_dev) >= len(data):
+            std_dev = np.asarray(std_dev[:len(data)], dtype=np.float64)
+            fill_days, lower, upper = decimate_envelope(days, data - std_dev, data + std_dev, bins)
+            artists["fill"].set_verts([np.column_stack([
+                np.concatenate([fill_days, fill_days[::-1]]), np.concatenate([upper, lower[::-1]])])])
+            y_values += [lower, upper]
+        artists["line"].set_data(*decimate_minmax(days, data, bins))
+        self.fit_panel_limits(ax, days, np.concatenate(y_values))
+
+    def fit_panel_limits(self, ax, days, values):
+        """
+        Widen the limits of a panel to its data, if they do not already cover it.
+
+        Args:
+            ax (matplotlib.axes.Axes): The panel.
+            days (np.ndarray): X values drawn in the panel.
+            values (np.ndarray): Y values drawn in the panel.
+        """
+        if len(days) == 0:
+            return
+        values = values[np.isfinite(values)]
+        if len(values) == 0:
+            return
+        # The x-axis spans the whole simulated horizon (or a multiple of it once the run goes further), so that
+        # days streamed in later rarely change it
+        horizon = max(self.simulation.days, 1)
+        x_min, x_max = float(days[0]), float(horizon * max(1, -(-int(days[-1]) // horizon)))
+        y_min, y_max = float(values.min()), float(values.max())
+        margin = 0.05 * (y_max - y_min) or 0.5
+        current_x, current_y = ax.get_xlim(), ax.get_ylim()
+        if self.panels_need_full_draw or current_x != (x_min, x_max) or y_min < current_y[0] or y_max > current_y[1]:
+            ax.set_xlim(x_min, x_max)
+            ax.set_ylim(y_min - margin, y_max + margin)
+            self.panels_need_full_draw = True
 
     def render_forests_graph(self, ax, color):
         """Render the forest count graph over time."""
@@ -501,8 +848,7 @@ class MatplotlibDisplay:
 
     def render_standardized_forests_graph(self, ax, color="green"):
         """Render the forests graph (Standardized)."""
-        standardized_data = self.standardize_data(
-            self.simulation.forest_count_over_time)
+        standardized_data = self.get_standardized_series("forest_count_over_time")
         self.render_generic_graph(
             ax=ax,
             title="Standardized Forest Count (Z-Score)",
@@ -545,8 +891,7 @@ class MatplotlibDisplay:
 
     def render_standardized_population_graph(self, ax, color="purple"):
         """Render the standardized population graph with temporal variability (z-scores)."""
-        standardized_data = self.standardize_data(
-            self.simulation.city_population_over_time)
+        standardized_data = self.get_standardized_series("city_population_over_time")
         self.render_generic_graph(
             ax=ax,
             title="Standardized City Count (Z-Score)",
@@ -591,8 +936,7 @@ class MatplotlibDisplay:
 
     def render_standardized_pollution_graph(self, ax, color="black"):
         """Render the standardized pollution graph with temporal variability (z-scores)."""
-        standardized_data = self.standardize_data(
-            self.simulation.pollution_over_time)
+        standardized_data = self.get_standardized_series("pollution_over_time")
         self.render_generic_graph(
             ax=ax,
             title="Standardized Pollution Level (Z-Score)",
@@ -637,8 +981,7 @@ class MatplotlibDisplay:
 
     def render_standardized_temperature_graph(self, ax, color="red"):
         """Render the standardized temperature graph with temporal variability (z-scores)."""
-        standardized_data = self.standardize_data(
-            self.simulation.temperature_over_time)
+        standardized_data = self.get_standardized_series("temperature_over_time")
         self.render_generic_graph(
             ax=ax,
             title="Standardized Temperature (Z-Score)",
@@ -683,8 +1026,7 @@ class MatplotlibDisplay:
 
     def render_standardized_water_mass_graph(self, ax, color="cyan"):
         """Render the standardized water mass graph with temporal variability (z-scores)."""
-        standardized_data = self.standardize_data(
-            self.simulation.water_mass_over_time)
+        standardized_data = self.get_standardized_series("water_mass_over_time")
         self.render_generic_graph(
             ax=ax,
             title="Standardized Water Mass (Z-Score)",
@@ -713,23 +1055,31 @@ class MatplotlibDisplay:
         )
 
     def standardize_data(self, data):
-        if not data:
-            return []
+        return standardize(data)
+
+    def get_standardized_series(self, name):
+        """
+        Get the z-scores of a series of the simulation, standardizing it only when it has grown.
 
-        data = np.array(data)
-        mean = data.mean()
-        std_dev = data.std()
-        if std_dev == 0:
-            return np.zeros_like(data)
-        return (data - mean) / std_dev
+        Args:
+            name (str): Name of the series attribute (e.g. "pollution_over_time").
+
+        Returns:
+            np.ndarray: The standardized series.
+        """
+        data = getattr(self.simulation, name)[:len(self.days)]
+        cached = self.standardized_series.get(name)
+        if cached is None or cached[0] != len(data):
+            cached = self.standardized_series[name] = (len(data), standardize(data))
+        return cached[1]
 
     def next_day(self):
-        if self.current_day < len(self.simulation.states) - 1:
+        if self.current_day < len(self.days) - 1:
             self.current_day += 1
             self.render_day(self.current_day)
 
     def previous_day(self):
-        if self.current_day > 0:
+        if self.current_day > self.simulation.first_stored_day:
             self.current_day -= 1
             self.render_day(self.current_day)
 
@@ -757,9 +1107,18 @@ class MatplotlibDisplay:
             self.three_d_window.deiconify()
             self.three_d_window.lift()
             self.three_d_window.focus_force()
-        else:
+        elif self.days:
             self.open_3d_in_new_window()
 
+    def bring_slice_to_front(self):
+        """Bring the 2D slice window to the front, opening it if needed."""
+        if self.slice_window and self.slice_window.winfo_exists():
+            self.slice_window.deiconify()
+            self.slice_window.lift()
+            self.slice_window.focus_force()
+        elif self.days:
+            self.open_slice_in_new_window(self.main_window)
+
     def minimize_config_window(self):
         """Minimize the configuration window."""
         if self.config_window and self.config_window.winfo_exists():
@@ -783,3 +1142,53 @@ class MatplotlibDisplay:
         """
         self.tint = enable  # Update the instance variable
         self.render_day(self.current_day)
+
+    def toggle_surface_only(self, enable):
+        """
+        Switch between drawing only the visible surface voxels and drawing every voxel, and re-render the current day.
+
+        Args:
+            enable (bool): Whether to draw only the surface voxels.
+        """
+        if enable == self.surface_only:
+            return
+        self.surface_only = enable
+        self.set_frame_options(surface_only=enable)
+
+    def set_level_of_detail(self, block_size):
+        """
+        Set the level of detail of the 3D view and re-render the current day.
+
+        Args:
+            block_size (int): Edge length of the blocks of voxels drawn as one point (1 for full resolution),
+                or None to pick it automatically from the point budget ("max_points_3d").
+        """
+        self.set_frame_options(block_size=block_size)
+
+    def apply_region(self):
+        """
+        Draw the region typed in the region field at full resolution (an empty field clears the region).
+        """
+        text = self.region_entry.get().strip() if self.region_entry else ""
+        region = None
+        if text:
+            try:
+                region = tuple(
+                    tuple(int(bound) for bound in part.split(":")) for part in text.replace(" ", "").split(","))
+                if len(region) != 3 or any(len(bounds) != 2 or bounds[0] >= bounds[1] for bounds in region):
+                    raise ValueError
+            except ValueError:
+                logging.info(f"Invalid region '{text}': expected x0:x1, y0:y1, z0:z1.")
+                return
+        self.set_frame_options(region=region)
+
+    def set_frame_options(self, **frame_options):
+        """
+        Change how the 3D frames are prepared (see frames.prepare_frame) and re-render the current day.
+
+        Args:
+            **frame_options: Options replacing the current ones (e.g. surface_only=False).
+        """
+        self.precomputed_data = []  # Frames are recomputed on demand with the new options
+        self.frame_cache.set_frame_options(**frame_options)
+        self.render_day(self.current_day)
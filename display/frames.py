@@ -0,0 +1,289 @@
+import numpy as np
+from config.presets import PARTICLE_MAPPING
+from core.fields import any_neighbor
+
+# Marker size of every voxel in the 3D view
+POINT_SIZE = 200.0
+# Edge lengths of the blocks of voxels merged into one point by the levels of detail, finest first
+LOD_BLOCK_SIZES = (1, 2, 4)
+# Color of transparent cells (Particle.get_base_color replaces fully transparent base colors with it)
+TRANSPARENT_COLOR = (1.0, 1.0, 1.0, 0.0)
+
+####################################################################################################################
+###################################### COLORS ######################################################################
+####################################################################################################################
+
+def build_palette(base_colors):
+    """
+    Build the base color lookup table of the cell types, like Particle.get_base_color.
+
+    Args:
+        base_colors (dict): RGBA base color of each cell type (the "base_colors" configuration).
+
+    Returns:
+        np.ndarray: (cell type count, 4) array of RGBA colors indexed by cell type.
+    """
+    palette = np.empty((len(PARTICLE_MAPPING), 4))
+    for cell_type in range(len(palette)):
+        base_color = base_colors.get(cell_type, TRANSPARENT_COLOR)
+        palette[cell_type] = base_color if base_color[3] != 0.0 else TRANSPARENT_COLOR
+    return palette
+
+
+def compute_tinted_colors(cell_type, temperature, pollution_level, config, palette=None):
+    """
+    Tint the base colors by pollution and temperature for whole arrays of cells, with the formulas of
+    Particle.get_color_tinted_by_attributes: air is grayed and made more transparent by pollution and turned
+    red/blue by temperature, vacuum is left as is, and the other types are darkened by pollution and reddened
+    by temperature.
+
+    Args:
+        cell_type (np.ndarray): Cell types.
+        temperature (np.ndarray): Temperatures, shaped like `cell_type`.
+        pollution_level (np.ndarray): Pollution levels, shaped like `cell_type`.
+        config (dict): Configuration holding the baseline temperatures and pollution levels.
+        palette (np.ndarray, optional): Base colors from build_palette. Defaults to the configuration's.
+
+    Returns:
+        np.ndarray: RGBA colors with a trailing axis of size 4.
+    """
+    if palette is None:
+        palette = build_palette(config["base_colors"])
+    type_count = len(palette)
+    baseline_pollution = np.array(
+        [config["baseline_pollution_level"][t] for t in range(type_count)], dtype=np.float64)[cell_type]
+    baseline_temperature = np.array(
+        [config["baseline_temperature"][t] for t in range(type_count)], dtype=np.float64)[cell_type]
+    base = palette[cell_type]
+    red, green, blue, alpha = (base[..., channel] for channel in range(4))
+
+    with np.errstate(divide="ignore", invalid="ignore"):
+        pollution_intensity = np.where(
+            baseline_pollution > 0, np.minimum(pollution_level / baseline_pollution, 1.0), 0.0)
+        temperature_intensity = np.where(
+            baseline_temperature != 0,
+            np.minimum(np.abs(temperature - baseline_temperature) / np.abs(baseline_temperature), 0.3), 0.0)
+
+    # General case: black tint by pollution blended with a red tint by temperature
+    darkening = 1.0 - pollution_intensity * 0.3
+    cooling = 1.0 - temperature_intensity * 0.2
+    colors = np.stack((
+        (red * darkening + np.minimum(1.0, red + temperature_intensity * 0.2)) / 2.0,
+        (green * darkening + green * cooling) / 2.0,
+        (blue * darkening + blue * cooling) / 2.0,
+        np.clip(alpha, 0.0, 1.0),
+    ), axis=-1)
+
+    # Air: gray tint by pollution blended with a red/blue tint by temperature, and pollution-driven transparency
+    air = cell_type == 6
+    graying = 1.0 - pollution_intensity[air] * 0.5
+    colors[air] = np.stack((
+        (red[air] * graying + np.minimum(1.0, red[air] + temperature_intensity[air] * 0.3)) / 2.0,
+        (green[air] * graying + green[air]) / 2.0,
+        (blue[air] * graying + np.maximum(0.0, blue[air] - temperature_intensity[air] * 0.3)) / 2.0,
+        np.maximum(0.2, np.minimum(1.0, alpha[air] * graying)),
+    ), axis=-1)
+
+    # Vacuum: no tint
+    vacuum = cell_type == 8
+    colors[vacuum] = base[vacuum]
+    return colors
+
+####################################################################################################################
+###################################### CULLING #####################################################################
+####################################################################################################################
+
+def compute_surface_mask(cell_type, palette):
+    """
+    Mark the voxels that can be seen: visible (not fully transparent) voxels with at least one face exposed to
+    a see-through neighbor (partly or fully transparent, e.g. air or vacuum) or to the outside of the grid.
+    Opaque voxels enclosed by opaque neighbors on all six faces are hidden and left out.
+
+    Args:
+        cell_type (np.ndarray): Cell types shaped like the grid.
+        palette (np.ndarray): Base colors from build_palette.
+
+    Returns:
+        np.ndarray: Boolean mask shaped like the grid.
+    """
+    alpha = palette[:, 3][cell_type]
+    see_through = np.pad(alpha < 1.0, 1, constant_values=True)  # The outside of the grid is see-through
+    exposed = any_neighbor(see_through)[1:-1, 1:-1, 1:-1]
+    return (alpha > 0.0) & exposed
+
+####################################################################################################################
+###################################### LEVEL OF DETAIL #############################################################
+####################################################################################################################
+
+def downsample_fields(cell_type, temperature, pollution_level, block_size, type_count=len(PARTICLE_MAPPING)):
+    """
+    Merge cubic blocks of voxels into single cells: each block takes its majority cell type (vacuum only if the
+    block holds nothing else) and the mean temperature and pollution of its cells of that type.
+    Blocks at the far edges of the grid may be partial.
+
+    Args:
+        cell_type (np.ndarray): Cell types shaped like the grid.
+        temperature (np.ndarray): Temperatures shaped like the grid.
+        pollution_level (np.ndarray): Pollution levels shaped like the grid.
+        block_size (int): Edge length of the blocks.
+        type_count (int): Number of cell types.
+
+    Returns:
+        tuple: Cell types, temperatures and pollution levels of the blocks (shaped like the grid of blocks), and
+            the coordinates of the block centers in voxel units (with a trailing axis of size 3).
+    """
+    shape = cell_type.shape
+    blocks_shape = tuple(-(-size // block_size) for size in shape)
+    padding = [(0, blocks * block_size - size) for blocks, size in zip(blocks_shape, shape)]
+
+    def split_blocks(values, fill):
+        padded = np.pad(values, padding, constant_values=fill)
+        split = padded.reshape(blocks_shape[0], block_size, blocks_shape[1], block_size, blocks_shape[2], block_size)
+        return split.transpose(0, 2, 4, 1, 3, 5).reshape(*blocks_shape, -1)
+
+    types = split_blocks(cell_type, 8)  # Padding reads as vacuum
+    counts = np.stack([(types == t).sum(axis=-1) for t in range(type_count)], axis=-1)
+    counts[..., 8] = 0
+    majority = np.where(counts.any(axis=-1), counts.argmax(axis=-1), 8)
+    members = types == majority[..., np.newaxis]
+    member_count = members.sum(axis=-1)
+    block_temperature = (split_blocks(temperature, 0.0) * members).sum(axis=-1) / member_count
+    block_pollution = (split_blocks(pollution_level, 0.0) * members).sum(axis=-1) / member_count
+
+    # Centers of the (possibly partial) blocks
+    axes = []
+    for blocks, size in zip(blocks_shape, shape):
+        starts = np.arange(blocks) * block_size
+        axes.append((starts + np.minimum(starts + block_size, size) - 1) / 2.0)
+    centers = np.stack(np.meshgrid(*axes, indexing="ij"), axis=-1)
+    return majority, block_temperature, block_pollution, centers
+
+####################################################################################################################
+###################################### SLICES ######################################################################
+####################################################################################################################
+
+SLICE_AXES = ("x", "y", "z")
+SLICE_FIELDS = ("cell_type", "temperature", "pollution_level", "water_mass")
+
+
+def prepare_slice(fields, axis, index, field, palette=None):
+    """
+    Cut a plane out of a day's field arrays for a 2D image.
+
+    Args:
+        fields (dict): Field arrays of the day (see World.get_field_arrays), including `field`.
+        axis (str): Axis orthogonal to the plane ("x", "y" or "z").
+        index (int): Position of the plane along that axis.
+        field (str): Field to show: "cell_type" (drawn with the base colors) or a float field.
+        palette (np.ndarray, optional): Base colors from build_palette; required for "cell_type".
+
+    Returns:
+        np.ndarray: The plane with the first remaining axis as columns and the second as rows (e.g. [y, x] for
+            a z-plane), as RGBA colors (trailing axis of size 4) for "cell_type" or as values otherwise.
+    """
+    plane = np.take(fields[field], index, axis=SLICE_AXES.index(axis)).T
+    if field == "cell_type":
+        return palette[plane]
+    return plane.astype(np.float64)
+
+####################################################################################################################
+###################################### FRAMES ######################################################################
+####################################################################################################################
+
+def _select_cells(cell_type, temperature, pollution_level, points, palette, surface_only, excluded=None):
+    """
+    Pick the cells to draw from a (possibly downsampled) grid.
+
+    Args:
+        cell_type, temperature, pollution_level (np.ndarray): Fields shaped like the grid.
+        points (np.ndarray): Coordinates of each cell, shaped like the grid with a trailing axis of size 3.
+        palette (np.ndarray): Base colors from build_palette.
+        surface_only (bool): Only keep the cells that can be seen (see compute_surface_mask).
+        excluded (tuple, optional): Slices of the grid left out (e.g. a region drawn at another resolution).
+
+    Returns:
+        tuple: Flat cell types, temperatures, pollution levels and (N, 3) coordinates of the selected cells.
+    """
+    selected = compute_surface_mask(cell_type, palette) if surface_only else np.ones(cell_type.shape, dtype=bool)
+    if excluded is not None:
+        selected[excluded] = False
+    return cell_type[selected], temperature[selected], pollution_level[selected], points[selected]
+
+
+def prepare_frame(state, config, palette=None, surface_only=False, block_size=1, max_points=None, region=None):
+    """
+    Compute the 3D view data of one day from its field arrays, without touching Particle objects.
+
+    Large grids can be drawn at a coarser level of detail, where each cubic block of voxels becomes one point
+    (see downsample_fields), except in an optional region kept at full resolution.
+
+    Args:
+        state (World or WorldSnapshot): The state to draw.
+        config (dict): Configuration holding the colors and baselines.
+        palette (np.ndarray, optional): Base colors from build_palette. Defaults to the configuration's.
+        surface_only (bool): Only keep the voxels that can be seen (see compute_surface_mask). Defaults to False.
+        block_size (int, optional): Edge length of the blocks merged into one point (1 for full resolution).
+            None picks the finest of LOD_BLOCK_SIZES that yields at most `max_points` points.
+        max_points (int, optional): Point budget used when `block_size` is None.
+        region (tuple, optional): ((x0, x1), (y0, y1), (z0, z1)) voxel ranges (end excluded) drawn at full
+            resolution, widened to whole blocks.
+
+    Returns:
+        dict: "points" ((N, 3) array of voxel or block-center coordinates, in grid order, the voxels of the
+            full-resolution region first), "untinted_colors" and
+            "tinted_colors" ((N, 4) RGBA arrays), "sizes" ((N,) marker sizes) and "block_size".
+    """
+    if palette is None:
+        palette = build_palette(config["base_colors"])
+    fields = state.get_field_arrays(("cell_type", "temperature", "pollution_level"))
+    cell_type = fields["cell_type"].astype(np.intp)
+    temperature = fields["temperature"].astype(np.float64)
+    pollution_level = fields["pollution_level"].astype(np.float64)
+    voxel_points = np.stack(np.indices(cell_type.shape), axis=-1)
+
+    for candidate in ((block_size,) if block_size is not None else LOD_BLOCK_SIZES):
+        if candidate == 1:
+            parts = [(_select_cells(cell_type, temperature, pollution_level, voxel_points, palette, surface_only), 1)]
+        else:
+            *block_fields, centers = downsample_fields(cell_type, temperature, pollution_level, candidate)
+            excluded = fine_region = None
+            if region is not None:
+                excluded = tuple(slice(start // candidate, -(-end // candidate)) for start, end in region)
+                fine_region = tuple(slice(part.start * candidate, part.stop * candidate) for part in excluded)
+            parts = [(_select_cells(*block_fields, centers, palette, surface_only, excluded), candidate)]
+            if fine_region is not None:
+                # The region keeps its voxels, culled against their full-resolution neighbors
+                fine = _select_cells(cell_type, temperature, pollution_level, voxel_points, palette, surface_only,
+                                     excluded=_outside(cell_type.shape, fine_region))
+                parts.insert(0, (fine, 1))
+        point_count = sum(len(selected[0]) for selected, _ in parts)
+        if max_points is None or block_size is not None or point_count <= max_points:
+            break
+    block_size = candidate
+
+    cell_types, temperatures, pollution_levels, points = (
+        np.concatenate([selected[index] for selected, _ in parts]) for index in range(4))
+    sizes = np.concatenate([np.full(len(selected[0]), POINT_SIZE * size ** 2) for selected, size in parts])
+    return {
+        "points": points,
+        "untinted_colors": palette[cell_types],
+        "tinted_colors": compute_tinted_colors(cell_types, temperatures, pollution_levels, config, palette),
+        "sizes": sizes,
+        "block_size": block_size,
+    }
+
+
+def _outside(shape, box):
+    """
+    Mask the cells of a grid that lie outside a box.
+
+    Args:
+        shape (tuple): Shape of the grid.
+        box (tuple): Slices of the box along each axis.
+
+    Returns:
+        np.ndarray: Boolean mask, True outside the box.
+    """
+    mask = np.ones(shape, dtype=bool)
+    mask[box] = False
+    return mask
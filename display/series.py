@@ -0,0 +1,94 @@
+import numpy as np
+
+# Series longer than this many points per pixel of their axes are decimated before plotting
+DECIMATION_POINTS_PER_PIXEL = 2
+
+####################################################################################################################
+###################################### STANDARDIZATION #############################################################
+####################################################################################################################
+
+def standardize(data):
+    """
+    Convert a series to z-scores.
+
+    Args:
+        data (list): Values of the series.
+
+    Returns:
+        np.ndarray: (value - mean) / standard deviation, or zeros if the series is constant.
+    """
+    data = np.asarray(data, dtype=np.float64)
+    if data.size == 0:
+        return data
+    std_dev = data.std()
+    if std_dev == 0:
+        return np.zeros_like(data)
+    return (data - data.mean()) / std_dev
+
+####################################################################################################################
+###################################### DECIMATION ##################################################################
+####################################################################################################################
+
+def _bin_rows(values, bins):
+    """
+    Split a series into `bins` consecutive bins of equal length, padding the last bin with the last value.
+
+    Args:
+        values (np.ndarray): Values of the series.
+        bins (int): Number of bins.
+
+    Returns:
+        tuple: The (bins, bin length) array of values and the bin length.
+    """
+    length = -(-len(values) // bins)
+    padded = np.concatenate([values, np.full(bins * length - len(values), values[-1])])
+    return padded.reshape(bins, length), length
+
+
+def decimate_minmax(x, y, bins):
+    """
+    Reduce a line to the minimum and maximum of each bin, in their original order, so that peaks survive.
+
+    Args:
+        x (np.ndarray): X values of the line.
+        y (np.ndarray): Y values of the line.
+        bins (int): Number of bins, usually the width of the axes in pixels.
+
+    Returns:
+        tuple: The decimated (x, y), or the inputs if they have no more than two points per bin.
+    """
+    x = np.asarray(x)
+    y = np.asarray(y, dtype=np.float64)
+    if bins < 1 or len(y) <= DECIMATION_POINTS_PER_PIXEL * bins:
+        return x, y
+    rows, length = _bin_rows(y, bins)
+    starts = np.arange(bins) * length
+    lowest = np.minimum(starts + rows.argmin(axis=1), len(y) - 1)
+    highest = np.minimum(starts + rows.argmax(axis=1), len(y) - 1)
+    indices = np.stack([np.minimum(lowest, highest), np.maximum(lowest, highest)], axis=1).ravel()
+    return x[indices], y[indices]
+
+
+def decimate_envelope(x, lower, upper, bins):
+    """
+    Reduce a band to the lowest lower bound and highest upper bound of each bin.
+
+    Args:
+        x (np.ndarray): X values of the band.
+        lower (np.ndarray): Lower bound of the band.
+        upper (np.ndarray): Upper bound of the band.
+        bins (int): Number of bins, usually the width of the axes in pixels.
+
+    Returns:
+        tuple: The decimated (x, lower, upper), or the inputs if they have no more than two points per bin.
+    """
+    x = np.asarray(x)
+    lower = np.asarray(lower, dtype=np.float64)
+    upper = np.asarray(upper, dtype=np.float64)
+    if bins < 1 or len(x) <= DECIMATION_POINTS_PER_PIXEL * bins:
+        return x, lower, upper
+    lower_rows, length = _bin_rows(lower, bins)
+    upper_rows, _ = _bin_rows(upper, bins)
+    # Each bin's bounds start at its first x value; the last point closes the band
+    bin_x = np.append(x[np.minimum(np.arange(bins) * length, len(x) - 1)], x[-1])
+    return (bin_x, np.append(lower_rows.min(axis=1), lower[-1]), np.append(upper_rows.max(axis=1), upper[-1]))
@@ -4,6 +4,7 @@ from config.Config import config_instance
 from config.presets import PRESET_CONFIGS, DEFAULT_PRESET, PARTICLE_MAPPING, KEY_LABELS
 from display.MatplotlibDisplay import MatplotlibDisplay
 from core.Simulation import Simulation
+from core.SimulationWorker import SimulationWorker
 
 # Configure logging
 logger = logging.getLogger()
@@ -168,14 +169,16 @@ if __name__ == "__main__":
             logging.info("Initial ratios do not sum to 1. Adjusting to default ratios.")
             initial_ratios = DEFAULT_PRESET["initial_ratios"]
 
-        # Initialize and run simulation
+        # Initialize the simulation and run it in the background up to the horizon, displaying each day as soon as it
+        # is computed; the GUI controls can then pause it or run it further
         simulation = Simulation(grid_size=grid_size, initial_ratios=initial_ratios, days=days)
         logging.info("Starting simulation...")
-        simulation.precompute()
-        logging.info("Simulation complete. Displaying results.")
+        worker = SimulationWorker(simulation)
+        worker.start()
 
-        display = MatplotlibDisplay(simulation)
+        display = MatplotlibDisplay(simulation, worker=worker)
         display.render_graphic_user_interface()
+        display.close()
 
     except Exception as e:
         logging.error(f"An unexpected error occurred: {e}")